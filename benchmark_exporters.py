@@ -0,0 +1,62 @@
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+from player import Player
+from catalog_generator import CatalogGenerator
+from exporters import exportJson, exportNdjson, exportCsv
+
+
+def run(exporter, player, fileName):
+    """
+    Export the playlist of player once, timed.
+
+    Returns
+    -------
+    tuple
+        The records per second and the megabytes per second.
+    """
+    start = time.perf_counter()
+    count = exporter(player, fileName)
+    elapsed = time.perf_counter() - start
+    return count / elapsed, os.path.getsize(fileName) / elapsed / (1 << 20)
+
+
+def peakMemory(exporter, player, fileName):
+    """
+    Export the playlist of player once, traced, tracing slows the export down.
+
+    Returns
+    -------
+    float
+        The peak memory allocated while exporting, in KiB.
+    """
+    tracemalloc.start()
+    exporter(player, fileName)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the throughput of the playlist exporters.")
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--lazy", action="store_true", help="load the playlist with lazy=True")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "catalog.json")
+        CatalogGenerator(seed=args.seed).write(source, count=args.count)
+        player = Player()
+        player.loadFromJson(source, lazy=args.lazy)
+
+        print(f"{'format':<8} {'records/sec':>12} {'MB/sec':>8} {'peak KiB':>10}")
+        for name, exporter in (("json", exportJson), ("ndjson", exportNdjson), ("csv", exportCsv)):
+            fileName = os.path.join(directory, "export." + name)
+            results = [run(exporter, player, fileName) for _ in range(args.repeat)]
+            recordsPerSecond, megabytesPerSecond = max(results, key=lambda result: result[0])
+            peak = peakMemory(exporter, player, fileName)
+            print(f"{name:<8} {recordsPerSecond:>12,.0f} {megabytesPerSecond:>8.1f} {peak:>10,.0f}")
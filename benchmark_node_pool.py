@@ -0,0 +1,87 @@
+import gc
+import time
+import argparse
+from linked_list import LinkedList
+
+
+class GcMonitor:
+    """
+    Counts garbage collections and their total pause time while active.
+    """
+
+    def __init__(self):
+        self.collections = 0
+        self.pause = 0.0
+        self._start = None
+
+    def _callback(self, phase, info):
+        if phase == "start":
+            self._start = time.perf_counter()
+        elif self._start is not None:
+            self.pause += time.perf_counter() - self._start
+            self.collections += 1
+            self._start = None
+
+    def __enter__(self):
+        gc.collect()
+        gc.callbacks.append(self._callback)
+        return self
+
+    def __exit__(self, *exc):
+        gc.callbacks.remove(self._callback)
+
+
+def queueWorkload(linkedList, operations, depth):
+    """
+    Keep about depth elements queued, appending at the back and popping at the front.
+    """
+    for i in range(depth):
+        linkedList.append(i)
+    for i in range(operations // 2):
+        linkedList.append(i)
+        linkedList.popLeft()
+
+
+def editWorkload(linkedList, operations, depth):
+    """
+    Insert and delete near the front of a list holding about depth elements.
+    """
+    for i in range(depth):
+        linkedList.append(i)
+    for i in range(operations // 2):
+        index = i % 8
+        linkedList.addAtIndex(index, i)
+        linkedList.deleteAtIndex(index + 1)
+
+
+def run(workload, poolSize, operations, depth):
+    """
+    Run one workload on a fresh LinkedList.
+
+    Returns
+    -------
+    tuple
+        The operations per second, the number of collections and the total pause in ms.
+    """
+    linkedList = LinkedList(poolSize)
+    with GcMonitor() as monitor:
+        start = time.perf_counter()
+        workload(linkedList, operations, depth)
+        elapsed = time.perf_counter() - start
+    return operations / elapsed, monitor.collections, monitor.pause * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare LinkedList with and without a node pool.")
+    parser.add_argument("--operations", type=int, default=2000000)
+    parser.add_argument("--depth", type=int, default=1000)
+    parser.add_argument("--pool", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'workload':<8} {'pool':>6} {'ops/sec':>12} {'gc runs':>8} {'gc pause ms':>12}")
+    for name, workload in (("queue", queueWorkload), ("edit", editWorkload)):
+        for poolSize in (0, args.pool):
+            results = [run(workload, poolSize, args.operations, args.depth) for _ in range(args.repeat)]
+            opsPerSecond, collections, pause = max(results, key=lambda result: result[0])
+            print(f"{name:<8} {poolSize:>6} {opsPerSecond:>12,.0f} {collections:>8} {pause:>12.2f}")
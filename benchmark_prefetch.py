@@ -0,0 +1,76 @@
+import os
+import time
+import random
+import argparse
+import tempfile
+import contextlib
+from player import Player
+from prefetcher import Prefetcher, LocalFetcher
+from catalog_generator import CatalogGenerator
+
+
+def listen(player, fetcher, steps, think, skipRate, seed, prefetcher=None):
+    """
+    Step through the playlist with next() and play the media, sometimes
+    skipping a few media at once, pausing think seconds between steps.
+
+    Returns
+    -------
+    list
+        The latency of every next() + play() step in milliseconds, sorted.
+    """
+    rng = random.Random(seed)
+    player.resetCurrentMediaNode()
+    latencies = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(steps):
+            time.sleep(think)
+            skip = rng.randint(2, 5) if rng.random() < skipRate else 1
+            start = time.perf_counter()
+            for _ in range(skip):
+                if not player.next():
+                    player.resetCurrentMediaNode()
+            if prefetcher is not None:
+                prefetcher.play()
+            else:
+                fetcher(player.currentMediaNode.data.url)
+                player.play()
+            latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)
+
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare next() + play() latency with and without prefetching.")
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--think", type=float, default=0.005)
+    parser.add_argument("--skip", type=float, default=0.1)
+    parser.add_argument("--ahead", type=int, default=4)
+    parser.add_argument("--behind", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "catalog.json")
+        CatalogGenerator(seed=args.seed).write(source, count=args.count)
+
+        print(f"{'mode':<10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}  stats")
+        for mode in ("sync", "prefetch"):
+            player = Player()
+            player.loadFromJson(source, lazy=True)
+            fetcher = LocalFetcher(args.latency)
+            if mode == "sync":
+                latencies = listen(player, fetcher, args.steps, args.think, args.skip, args.seed)
+                stats = ""
+            else:
+                with Prefetcher(player, fetcher, ahead=args.ahead, behind=args.behind, workers=args.workers) as prefetcher:
+                    latencies = listen(player, fetcher, args.steps, args.think, args.skip, args.seed, prefetcher)
+                    stats = prefetcher.stats()
+            print(f"{mode:<10} {percentile(latencies, 0.5):>8.2f} {percentile(latencies, 0.99):>8.2f} "
+                  f"{latencies[-1]:>8.2f}  {stats}")
@@ -0,0 +1,280 @@
+import json
+import zlib
+import random
+import argparse
+
+
+class CatalogGenerator:
+    """
+    A seeded generator of synthetic iTunes search style records.
+
+    The generator streams a JSON array of records to disk one record at a time,
+    so the size of the output is only bounded by the disk, not by memory.
+    The output has the same shape as base_data.json and can be read back
+    with Player.loadFromJson.
+
+    Attributes
+    ----------
+    seed : int
+        The seed of the random number generator, the same seed and settings
+        always produce byte identical output.
+    mix : dict
+        The relative weight of each record kind, the keys are "song",
+        "feature-movie" and "other".
+    cardinality : dict
+        The number of distinct values for "artistName", "collectionName"
+        and "trackName".
+    skew : float
+        The exponent of the zipf like distribution used to draw strings,
+        0 means uniform, larger values make popular strings more popular.
+    duplicateRate : float
+        The probability that a record repeats a recently generated record.
+    duplicateWindow : int
+        The number of recent records kept as candidates for duplicates.
+
+    Methods
+    -------
+    records()
+        Yields an endless stream of record dictionaries.
+
+    write(fileName, count=None, totalBytes=None, bufferSize=1 << 20)
+        Streams records to fileName as a JSON array.
+    """
+
+    KINDS = ("song", "feature-movie", "other")
+    OTHER_WRAPPERS = (("audiobook", None), ("track", "podcast"), ("track", "tv-episode"))
+    SONG_GENRES = ("Rock", "Alternative", "Pop", "Hip-Hop/Rap", "Punk", "Classical",
+                   "R&B/Soul", "Downtempo", "Hard Rock", "Jazz", "Country", "Electronic")
+    MOVIE_GENRES = ("Action & Adventure", "Kids & Family", "Drama", "Comedy",
+                    "Sci-Fi & Fantasy", "Horror", "Documentary", "Romance")
+    OTHER_GENRES = ("Biographies & Memoirs", "History", "Books", "Self-Development",
+                    "Animation", "Arts & Entertainment", "Visual Arts")
+    MOVIE_RATINGS = ("G", "PG", "PG-13", "R", "NR")
+    SONG_RATINGS = (None, None, None, "Explicit", "Clean")
+    WORDS = ("love", "night", "green", "day", "home", "alone", "yellow", "numb",
+             "guns", "path", "hidden", "court", "mist", "fury", "potter", "matrix",
+             "fresh", "air", "stories", "daddy", "amazing", "talk", "comics",
+             "century", "breakdown", "portrait", "piano", "electric", "tomorrow",
+             "friends", "people", "influence", "guide", "hours", "summer", "fire",
+             "river", "shadow", "light", "dream", "city", "heart", "storm", "gold")
+
+    def __init__(self, seed=0, mix=None, cardinality=None, skew=1.0,
+                 duplicateRate=0.0, duplicateWindow=1024):
+        """
+        Initializes the generator.
+
+        Parameters
+        ----------
+        seed : int
+            The seed of the random number generator, default value: 0
+        mix : dict or None
+            The relative weight of "song", "feature-movie" and "other" records,
+            missing kinds get weight 0, default value: {"song": 6, "feature-movie": 3, "other": 1}
+        cardinality : dict or None
+            The number of distinct "artistName", "collectionName" and "trackName"
+            values, default value: 10000 artists, 50000 collections, 200000 tracks
+        skew : float
+            The zipf exponent of the string distributions, default value: 1.0
+        duplicateRate : float
+            The probability, between 0 and 1, that a record repeats a recent one,
+            default value: 0.0
+        duplicateWindow : int
+            How many recent records are remembered for duplicates, default value: 1024
+        """
+        if not 0.0 <= duplicateRate <= 1.0:
+            raise ValueError("duplicateRate must be between 0 and 1")
+        self.seed = seed
+        self.mix = dict(mix) if mix else {"song": 6, "feature-movie": 3, "other": 1}
+        unknown = set(self.mix) - set(self.KINDS)
+        if unknown:
+            raise ValueError(f"unknown record kinds in mix: {sorted(unknown)}")
+        if sum(self.mix.values()) <= 0:
+            raise ValueError("mix needs at least one positive weight")
+        self.cardinality = {"artistName": 10000, "collectionName": 50000, "trackName": 200000}
+        if cardinality:
+            self.cardinality.update(cardinality)
+        self.skew = skew
+        self.duplicateRate = duplicateRate
+        self.duplicateWindow = duplicateWindow
+
+    def _rank(self, rng, field):
+        """
+        Draw a rank in [0, cardinality) for the given field.
+        Low ranks are drawn more often the larger the skew is, which mimics
+        the long tail of real catalogs without building a table per field.
+        """
+        size = self.cardinality[field]
+        if self.skew <= 0:
+            return rng.randrange(size)
+        return min(int(size * rng.random() ** (1.0 + self.skew)), size - 1)
+
+    def _name(self, rng, field):
+        """
+        Turn a drawn rank into a deterministic, human looking string.
+        The same rank always maps to the same string, so the cardinality of
+        the field is exactly the configured number of distinct values.
+        """
+        rank = self._rank(rng, field)
+        words = self.WORDS
+        count = len(words)
+        first = words[rank % count].capitalize()
+        second = words[(rank // count) % count].capitalize()
+        return f"{first} {second} {rank}"
+
+    def _record(self, rng, recordId):
+        """
+        Build one record dictionary with iTunes search field names.
+        """
+        kinds = [kind for kind in self.KINDS if self.mix.get(kind, 0) > 0]
+        kind = rng.choices(kinds, weights=[self.mix[k] for k in kinds])[0]
+        artist = self._name(rng, "artistName")
+        collection = self._name(rng, "collectionName")
+        collectionId = 100000000 + zlib.crc32(collection.encode("utf-8")) % 900000000
+        year = rng.randint(1950, 2024)
+        releaseDate = f"{year:04d}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00Z"
+        slug = collection.lower().replace(" ", "-")
+
+        if kind == "other":
+            wrapperType, subKind = rng.choice(self.OTHER_WRAPPERS)
+        else:
+            wrapperType, subKind = "track", kind
+
+        record = {"wrapperType": wrapperType}
+        if subKind:
+            record["kind"] = subKind
+        record["collectionId"] = collectionId
+        if wrapperType == "track":
+            record["trackId"] = recordId
+        record["artistName"] = artist
+        record["collectionName"] = collection
+
+        if kind == "song":
+            track = self._name(rng, "trackName")
+            record["trackName"] = track
+            record["collectionViewUrl"] = f"https://music.apple.com/us/album/{slug}/{collectionId}?i={recordId}&uo=4"
+            record["trackViewUrl"] = record["collectionViewUrl"]
+            record["releaseDate"] = releaseDate
+            record["trackTimeMillis"] = int(rng.gauss(230000, 60000)) if rng.random() < 0.98 else rng.randint(30000, 1200000)
+            record["primaryGenreName"] = rng.choice(self.SONG_GENRES)
+            rating = rng.choice(self.SONG_RATINGS)
+            if rating:
+                record["contentAdvisoryRating"] = rating
+        elif kind == "feature-movie":
+            track = self._name(rng, "trackName")
+            record["trackName"] = track
+            record["collectionViewUrl"] = f"https://itunes.apple.com/us/movie/{slug}/id{recordId}?uo=4"
+            record["trackViewUrl"] = record["collectionViewUrl"]
+            record["releaseDate"] = releaseDate
+            record["trackTimeMillis"] = int(rng.gauss(6600000, 1200000))
+            record["primaryGenreName"] = rng.choice(self.MOVIE_GENRES)
+            record["contentAdvisoryRating"] = rng.choice(self.MOVIE_RATINGS)
+        else:
+            if wrapperType == "track":
+                record["trackName"] = self._name(rng, "trackName")
+                record["trackTimeMillis"] = rng.randint(1000, 3600000)
+            record["collectionViewUrl"] = f"https://books.apple.com/us/{subKind or wrapperType}/{slug}/id{collectionId}?uo=4"
+            record["releaseDate"] = releaseDate
+            record["primaryGenreName"] = rng.choice(self.OTHER_GENRES)
+
+        if record.get("trackTimeMillis", 1) <= 0:
+            record["trackTimeMillis"] = 1000
+        record["country"] = "USA"
+        record["currency"] = "USD"
+        return record
+
+    def records(self):
+        """
+        Yield an endless, deterministic stream of record dictionaries.
+        Only the last duplicateWindow records are kept in memory.
+
+        Yields
+        ------
+        dict
+            The next record.
+        """
+        rng = random.Random(self.seed)
+        recent = []
+        recordId = 1000000000
+        while True:
+            if recent and rng.random() < self.duplicateRate:
+                yield rng.choice(recent)
+                continue
+            recordId += 1
+            record = self._record(rng, recordId)
+            if self.duplicateWindow > 0:
+                if len(recent) < self.duplicateWindow:
+                    recent.append(record)
+                else:
+                    recent[rng.randrange(self.duplicateWindow)] = record
+            yield record
+
+    def write(self, fileName, count=None, totalBytes=None, bufferSize=1 << 20):
+        """
+        Stream records to fileName as a JSON array.
+        Stops after count records or once at least totalBytes have been
+        written, whichever comes first. At least one limit is required.
+
+        Parameters
+        ----------
+        fileName : str
+            The path of the JSON file to create.
+        count : int or None
+            The number of records to write.
+        totalBytes : int or None
+            The approximate size of the file in bytes.
+        bufferSize : int
+            The size of the write buffer in bytes, default value: 1 MiB
+
+        Returns
+        -------
+        tuple
+            The number of records and the number of bytes written.
+        """
+        if count is None and totalBytes is None:
+            raise ValueError("either count or totalBytes is required")
+
+        written = 0
+        size = 0
+        encode = json.JSONEncoder(ensure_ascii=False, separators=(", ", ": ")).encode
+        with open(fileName, "w", encoding="utf-8", buffering=bufferSize) as file:
+            file.write("[")
+            size += 1
+            for record in self.records():
+                if count is not None and written >= count:
+                    break
+                if totalBytes is not None and size >= totalBytes:
+                    break
+                chunk = ("\n" if written == 0 else ",\n") + encode(record)
+                file.write(chunk)
+                size += len(chunk.encode("utf-8"))
+                written += 1
+            file.write("\n]\n")
+            size += 3
+        return written, size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic iTunes style catalog.")
+    parser.add_argument("fileName")
+    parser.add_argument("--count", type=int)
+    parser.add_argument("--bytes", type=int, dest="totalBytes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--songs", type=float, default=6)
+    parser.add_argument("--movies", type=float, default=3)
+    parser.add_argument("--other", type=float, default=1)
+    parser.add_argument("--artists", type=int, default=10000)
+    parser.add_argument("--collections", type=int, default=50000)
+    parser.add_argument("--tracks", type=int, default=200000)
+    parser.add_argument("--skew", type=float, default=1.0)
+    parser.add_argument("--duplicates", type=float, default=0.0)
+    args = parser.parse_args()
+
+    generator = CatalogGenerator(
+        seed=args.seed,
+        mix={"song": args.songs, "feature-movie": args.movies, "other": args.other},
+        cardinality={"artistName": args.artists, "collectionName": args.collections, "trackName": args.tracks},
+        skew=args.skew,
+        duplicateRate=args.duplicates
+    )
+    records, size = generator.write(args.fileName, count=args.count, totalBytes=args.totalBytes)
+    print(f"Wrote {records} records ({size} bytes) to {args.fileName}")
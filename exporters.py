@@ -0,0 +1,174 @@
+import csv
+import json
+
+# Every field written by Media.toRecord, Track.toRecord and Movie.toRecord.
+CSV_FIELDS = ("wrapperType", "kind", "trackName", "collectionName", "artistName",
+              "releaseDate", "trackViewUrl", "collectionViewUrl", "primaryGenreName",
+              "contentAdvisoryRating", "trackTimeMillis")
+_INTEGER_FIELDS = ("trackTimeMillis",)
+
+
+def _records(player):
+    """
+    Yield the json object of every media of the playlist, front to back.
+    The playlist is read through a snapshot, so the output is consistent
+    even if the player is changed while exporting. Lazy media are decoded
+    one at a time and are not kept decoded.
+    """
+    with player.snapshot() as view:
+        for media in view:
+            yield media.toRecord()
+
+
+def _writeChunked(file, pieces, chunkSize):
+    """
+    Write an iterable of strings, joined into chunks of about chunkSize characters.
+
+    Returns
+    -------
+    int
+        The number of pieces written.
+    """
+    chunk = []
+    length = 0
+    count = 0
+    for piece in pieces:
+        chunk.append(piece)
+        length += len(piece)
+        count += 1
+        if length >= chunkSize:
+            file.write("".join(chunk))
+            chunk = []
+            length = 0
+    if chunk:
+        file.write("".join(chunk))
+    return count
+
+
+def exportJson(player, fileName, chunkSize=1 << 16):
+    """
+    Write the playlist as a json array in the format of base_data.json,
+    which Player.loadFromJson reads back.
+    Media are encoded one at a time and written in chunks, so memory use
+    doesn't grow with the size of the playlist.
+
+    Parameters
+    ----------
+    player : Player
+        The player whose playlist is written.
+    fileName : str
+        The name of the JSON file to create.
+    chunkSize : int
+        The number of characters written at a time, default value: 64 KiB
+
+    Returns
+    -------
+    int
+        The number of media written.
+    """
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+
+    def pieces():
+        separator = "\n"
+        for record in _records(player):
+            yield separator + encode(record)
+            separator = ",\n"
+
+    with open(fileName, "w", encoding="utf-8") as file:
+        file.write("[")
+        count = _writeChunked(file, pieces(), chunkSize)
+        file.write("\n]\n")
+    return count
+
+
+def exportNdjson(player, fileName, chunkSize=1 << 16):
+    """
+    Write the playlist as newline delimited json, one media per line.
+    readNdjson reads it back for Player.loadFromRecords.
+
+    Parameters
+    ----------
+    player : Player
+        The player whose playlist is written.
+    fileName : str
+        The name of the file to create.
+    chunkSize : int
+        The number of characters written at a time, default value: 64 KiB
+
+    Returns
+    -------
+    int
+        The number of media written.
+    """
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    with open(fileName, "w", encoding="utf-8") as file:
+        return _writeChunked(file, (encode(record) + "\n" for record in _records(player)), chunkSize)
+
+
+def exportCsv(player, fileName, bufferSize=1 << 16):
+    """
+    Write the playlist as CSV with one column per field of CSV_FIELDS.
+    Missing and None values are written as empty cells.
+    readCsv reads it back for Player.loadFromRecords.
+
+    Parameters
+    ----------
+    player : Player
+        The player whose playlist is written.
+    fileName : str
+        The name of the CSV file to create.
+    bufferSize : int
+        The size of the file buffer in bytes, default value: 64 KiB
+
+    Returns
+    -------
+    int
+        The number of media written.
+    """
+    count = 0
+    with open(fileName, "w", encoding="utf-8", newline="", buffering=bufferSize) as file:
+        writer = csv.DictWriter(file, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for record in _records(player):
+            writer.writerow(record)
+            count += 1
+    return count
+
+
+def readNdjson(fileName):
+    """
+    Yield the json objects of a file written by exportNdjson, one at a time.
+
+    Parameters
+    ----------
+    fileName : str
+        The name of the file to read.
+    """
+    with open(fileName, "r", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def readCsv(fileName):
+    """
+    Yield the json objects of a file written by exportCsv, one at a time.
+    Empty cells are left out, so the loader falls back to its defaults,
+    and trackTimeMillis is turned back into a number.
+
+    Parameters
+    ----------
+    fileName : str
+        The name of the CSV file to read.
+    """
+    with open(fileName, "r", encoding="utf-8", newline="") as file:
+        for row in csv.DictReader(file):
+            record = {key: value for key, value in row.items() if value != ""}
+            for key in _INTEGER_FIELDS:
+                if key in record:
+                    record[key] = int(record[key])
+            yield record
+
+
+if __name__ == "__main__":
+    pass
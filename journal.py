@@ -0,0 +1,445 @@
+import os
+import json
+import time
+import zlib
+import struct
+import threading
+from media import mediaFromRecord
+from player import Player
+
+MAGIC = b'PLJ1'
+# magic, generation of the snapshot the journal applies to
+_HEADER = struct.Struct('<4sQ')
+# operation, payload length, crc32 of the operation and the payload
+_RECORD = struct.Struct('<BII')
+
+OP_ADD = 1
+OP_REMOVE = 2
+OP_BATCH = 3
+OP_MERGE = 4
+OP_SPLIT = 5
+OP_CLEAR = 6
+OP_NEXT = 7
+OP_PREV = 8
+OP_RESET = 9
+OP_JUMP = 10
+
+
+def _fsyncDirectory(directory):
+    """
+    Make a rename in directory durable, where the platform allows it.
+    """
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _nodeIndex(player, node):
+    """
+    Return the index of a node in the playlist of player, or None.
+    """
+    current = player.playlist.dummyHead.next
+    index = 0
+    while current != player.playlist.dummyTail:
+        if current is node:
+            return index
+        current = current.next
+        index += 1
+    return None
+
+
+def writeSnapshot(player, fileName, generation=0):
+    """
+    Write the whole playlist and the position of the currentMediaNode to
+    fileName, one media at a time.
+    The file is written next to its final name, synced and renamed over
+    it, so a crash leaves either the old or the new snapshot.
+
+    Parameters
+    ----------
+    player : Player
+        The player to save.
+    fileName : str
+        The name of the snapshot file.
+    generation : int
+        A number stored in the snapshot to match it with its journal, default value: 0
+    """
+    temporary = fileName + '.tmp'
+    current = None
+    with open(temporary, 'w', encoding='utf-8') as file:
+        file.write('{"generation": %d, "media": [' % generation)
+        node = player.playlist.dummyHead.next
+        index = 0
+        while node != player.playlist.dummyTail:
+            if node is player.currentMediaNode:
+                current = index
+            file.write((",\n" if index else "\n") + json.dumps(node.data.toRecord()))
+            node = node.next
+            index += 1
+        file.write('\n], "current": %s}\n' % json.dumps(current))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, fileName)
+    _fsyncDirectory(os.path.dirname(os.path.abspath(fileName)))
+
+
+def readSnapshot(fileName):
+    """
+    Rebuild a Player from a file written by writeSnapshot.
+
+    Parameters
+    ----------
+    fileName : str
+        The name of the snapshot file.
+
+    Returns
+    -------
+    tuple
+        The Player and the generation of the snapshot.
+    """
+    with open(fileName, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    player = Player()
+    for record in data["media"]:
+        player.addMedia(mediaFromRecord(record))
+    current = data.get("current")
+    if current is None:
+        player.currentMediaNode = None
+    else:
+        node = player.playlist.dummyHead.next
+        for _ in range(current):
+            node = node.next
+        player.currentMediaNode = node
+    return player, data.get("generation", 0)
+
+
+class PlaylistJournal:
+    """
+    Crash safe, incremental persistence of a Player.
+
+    Every change of the playlist and of the currentMediaNode is appended to
+    a binary journal instead of rewriting the whole playlist. Records are
+    buffered and written with a single fsync per group (group commit),
+    once groupSize records are waiting or the oldest has waited
+    groupInterval seconds, whichever comes first; a background thread
+    commits a group that no further change completes.
+    Once the journal outgrows the snapshot, by compactRatio and at least
+    compactMinBytes, the playlist is written as a full snapshot and the
+    journal starts over, so the rewrites cost O(1) amortized per record
+    whatever the size of the playlist. Recovery loads the last snapshot
+    and replays the journal on top of it, ignoring a torn or corrupt tail.
+
+    A directory holds two files:
+        snapshot.json  the playlist at the start of the current generation
+        journal.log    a header with the generation, then the records
+
+    Records that have not been committed yet are lost on a crash;
+    call commit() to make every change so far durable.
+
+    Attributes
+    ----------
+    directory : str
+        The directory holding the snapshot and the journal.
+    player : Player or None
+        The player being journaled, set by recover().
+    generation : int
+        The generation of the current snapshot.
+    groupSize : int
+        The number of records that triggers a commit.
+    groupInterval : float
+        The age in seconds of the oldest uncommitted record that triggers a commit.
+    compactRatio : float
+        The size of the journal relative to the snapshot that triggers a
+        compaction, 0 disables it.
+    compactMinBytes : int
+        The size in bytes the journal must reach before it is compacted.
+    """
+
+    def __init__(self, directory, groupSize=64, groupInterval=0.05, compactRatio=1.0, compactMinBytes=1 << 20):
+        """
+        Initializes the journal, call recover() to get the Player.
+
+        Parameters
+        ----------
+        directory : str
+            The directory to keep the files in, created if needed.
+        groupSize : int
+            The number of records committed together, default value: 64
+        groupInterval : float
+            The longest time in seconds a record waits for its group, default value: 0.05
+        compactRatio : float
+            Compact once the journal is this many times the size of the snapshot, default value: 1.0
+        compactMinBytes : int
+            Never compact a journal smaller than this, default value: 1 MiB
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.snapshotFile = os.path.join(directory, 'snapshot.json')
+        self.journalFile = os.path.join(directory, 'journal.log')
+        self.groupSize = groupSize
+        self.groupInterval = groupInterval
+        self.compactRatio = compactRatio
+        self.compactMinBytes = compactMinBytes
+        self.player = None
+        self.generation = 0
+        self.records = 0
+        self._file = None
+        self._buffer = bytearray()
+        self._pending = 0
+        self._firstPending = 0.0
+        self._journalBytes = 0
+        self._snapshotBytes = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flusher = None
+        self._closed = False
+
+    def recover(self):
+        """
+        Rebuild the Player from the last snapshot and the journal, then
+        start journaling its changes.
+
+        Returns
+        -------
+        Player
+            The recovered player, an empty one if nothing was saved yet.
+        """
+        if os.path.exists(self.snapshotFile):
+            player, self.generation = readSnapshot(self.snapshotFile)
+            self._snapshotBytes = os.path.getsize(self.snapshotFile)
+        else:
+            player, self.generation = Player(), 0
+
+        replayed, end = self._replay(player)
+        if end is None:
+            self._startJournal()
+        else:
+            self._file = open(self.journalFile, 'r+b')
+            self._file.truncate(end)
+            self._file.seek(end)
+            self._journalBytes = end
+        self.records = replayed
+
+        self.player = player
+        player.addObserver(self)
+        self._closed = False
+        if self.groupInterval > 0:
+            self._flusher = threading.Thread(target=self._flushLoop, name="journal-flusher", daemon=True)
+            self._flusher.start()
+        return player
+
+    def _replay(self, player):
+        """
+        Apply the valid records of the journal to player.
+
+        Returns
+        -------
+        tuple
+            The number of records applied and the offset where the valid
+            records end, or None as the offset if the journal is missing or
+            belongs to another snapshot.
+        """
+        if not os.path.exists(self.journalFile):
+            return 0, None
+        with open(self.journalFile, 'rb') as file:
+            header = file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return 0, None
+            magic, generation = _HEADER.unpack(header)
+            if magic != MAGIC or generation != self.generation:
+                return 0, None
+
+            replayed = 0
+            end = _HEADER.size
+            while True:
+                head = file.read(_RECORD.size)
+                if len(head) < _RECORD.size:
+                    break
+                op, length, crc = _RECORD.unpack(head)
+                payload = file.read(length)
+                if len(payload) < length or zlib.crc32(bytes([op]) + payload) != crc:
+                    break
+                self._apply(player, op, json.loads(payload) if payload else None)
+                replayed += 1
+                end += _RECORD.size + length
+        return replayed, end
+
+    @staticmethod
+    def _apply(player, op, payload):
+        """
+        Redo one journaled operation on player.
+        """
+        if op == OP_ADD:
+            player.addMedia(mediaFromRecord(payload))
+        elif op == OP_REMOVE:
+            player.removeMedia(payload)
+        elif op == OP_BATCH:
+            player.applyBatch([(index, record) for index, record in payload["insert"]], payload["delete"])
+        elif op == OP_MERGE:
+            other = Player()
+            for record in payload["media"]:
+                other.addMedia(mediaFromRecord(record))
+            player.mergePlaylist(other, payload["afterCurrent"])
+        elif op == OP_SPLIT:
+            player.splitAtCurrent()
+        elif op == OP_CLEAR:
+            Player().mergePlaylist(player)
+        elif op == OP_NEXT:
+            player.next()
+        elif op == OP_PREV:
+            player.prev()
+        elif op == OP_RESET:
+            player.resetCurrentMediaNode()
+        elif op == OP_JUMP:
+            node = player.playlist.dummyHead.next
+            for _ in range(payload):
+                node = node.next
+            player.jumpTo(node)
+        else:
+            raise ValueError(f"unknown journal operation {op}")
+
+    def _startJournal(self):
+        """
+        Replace the journal with an empty one for the current generation.
+        """
+        if self._file is not None:
+            self._file.close()
+        temporary = self.journalFile + '.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(_HEADER.pack(MAGIC, self.generation))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.journalFile)
+        _fsyncDirectory(self.directory)
+        self._file = open(self.journalFile, 'ab')
+        self._journalBytes = _HEADER.size
+
+    def __call__(self, event, *args):
+        """
+        The Player observer callback, appends the record of one change.
+        """
+        if event == "add":
+            self._append(OP_ADD, args[0].toRecord())
+        elif event == "remove":
+            self._append(OP_REMOVE, args[0])
+        elif event == "batch":
+            insertions, deletions = args
+            self._append(OP_BATCH, {"insert": [[index, media.toRecord()] for index, media in insertions],
+                                    "delete": deletions})
+        elif event == "merge":
+            mediaList, afterCurrent = args
+            self._append(OP_MERGE, {"media": [media.toRecord() for media in mediaList],
+                                    "afterCurrent": afterCurrent})
+        elif event == "split":
+            self._append(OP_SPLIT)
+        elif event == "clear":
+            self._append(OP_CLEAR)
+        elif event == "next":
+            self._append(OP_NEXT)
+        elif event == "prev":
+            self._append(OP_PREV)
+        elif event == "reset":
+            self._append(OP_RESET)
+        elif event == "jump":
+            self._append(OP_JUMP, _nodeIndex(self.player, args[0]))
+
+    def _append(self, op, payload=None):
+        """
+        Buffer one record, then commit or compact if it is time to.
+        """
+        data = b'' if payload is None else json.dumps(payload).encode('utf-8')
+        with self._lock:
+            self._buffer += _RECORD.pack(op, len(data), zlib.crc32(bytes([op]) + data))
+            self._buffer += data
+            self._journalBytes += _RECORD.size + len(data)
+            if self._pending == 0:
+                self._firstPending = time.monotonic()
+                self._wakeup.notify()
+            self._pending += 1
+            self.records += 1
+
+            if self.compactRatio and self._journalBytes >= max(self.compactMinBytes,
+                                                               self.compactRatio * self._snapshotBytes):
+                self._compact()
+            elif self._pending >= self.groupSize or time.monotonic() - self._firstPending >= self.groupInterval:
+                self._commit()
+
+    def _flushLoop(self):
+        """
+        Commit the buffered records once the oldest has waited groupInterval
+        seconds, for groups that no later record completes.
+        """
+        with self._lock:
+            while not self._closed:
+                if not self._pending:
+                    self._wakeup.wait()
+                    continue
+                delay = self._firstPending + self.groupInterval - time.monotonic()
+                if delay > 0:
+                    self._wakeup.wait(delay)
+                else:
+                    self._commit()
+
+    def commit(self):
+        """
+        Write the buffered records and fsync the journal.
+        """
+        with self._lock:
+            self._commit()
+
+    def _commit(self):
+        """
+        commit() with the lock held.
+        """
+        if not self._buffer:
+            return
+        self._file.write(self._buffer)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._buffer = bytearray()
+        self._pending = 0
+
+    def compact(self):
+        """
+        Write the playlist as a new snapshot and start an empty journal.
+        A crash in between is safe: the old journal belongs to the old
+        generation, so it is ignored once the new snapshot exists.
+        """
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        """
+        compact() with the lock held.
+        """
+        self._commit()
+        self.generation += 1
+        writeSnapshot(self.player, self.snapshotFile, self.generation)
+        self._snapshotBytes = os.path.getsize(self.snapshotFile)
+        self._startJournal()
+        self.records = 0
+
+    def close(self):
+        """
+        Commit the buffered records and stop journaling the player.
+        """
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+            self._commit()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        if self.player is not None:
+            self.player.removeObserver(self)
+
+
+if __name__ == "__main__":
+    pass
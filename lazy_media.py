@@ -0,0 +1,233 @@
+import os
+import re
+import json
+import threading
+from media import mediaFromRecord
+
+# Skips any run of plain bytes and complete json strings, then captures the
+# next bracket. A string cut off at the end of the buffer makes the match fail.
+_NEXT_BRACKET = re.compile(rb'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*([\[\]{}])', re.S)
+# The first "}" followed by the next element of the array or by its end,
+# a candidate for the end of the object starting before it.
+_RECORD_END = re.compile(rb'\}\s*(?:,\s*(?=\{)|(?=\]))')
+
+
+def scanRecordOffsets(fileName, chunkSize=1 << 20):
+    """
+    Find the byte range of every json object in a json array file
+    without decoding the objects.
+    The file is read in chunks, so memory use does not depend on the file size.
+
+    Most objects are found with a few C level searches: the end of an
+    object is taken to be the next "}" followed by "," and "{" or by "]".
+    That is only accepted if the object has no backslash, no "[" and an
+    even number of quotes, which rules out a "}" inside a string or a
+    nested array. Any other object is walked bracket by bracket.
+
+    Parameters
+    ----------
+    fileName : str
+        The name of the JSON file, the top level value must be an array.
+    chunkSize : int
+        The number of bytes read at a time, default value: 1 MiB
+
+    Yields
+    ------
+    tuple
+        The offset and the length in bytes of each object, in file order.
+    """
+    depth = 0
+    start = None
+    base = 0
+    buffer = b''
+    with open(fileName, 'rb') as file:
+        while True:
+            chunk = file.read(chunkSize)
+            if not chunk:
+                break
+            buffer += chunk
+            position = 0
+            while True:
+                match = _NEXT_BRACKET.match(buffer, position)
+                if not match:
+                    break
+                position = match.end()
+                if match.group(1) in b'[{':
+                    depth += 1
+                    if depth == 2 and match.group(1) == b'{':
+                        begin = match.start(1)
+                        end = _RECORD_END.search(buffer, begin)
+                        if (end is not None and buffer.find(b'\\', begin, end.start()) < 0
+                                and buffer.find(b'[', begin, end.start()) < 0
+                                and not buffer.count(b'"', begin, end.start()) & 1):
+                            yield base + begin, end.start() + 1 - begin
+                            position = end.start() + 1
+                            depth = 1
+                            continue
+                        start = base + begin
+                else:
+                    depth -= 1
+                    if depth == 1 and start is not None:
+                        yield start, base + position - start
+                        start = None
+            buffer = buffer[position:]
+            base += position
+
+
+class RecordSource:
+    """
+    A json array file shared by all the LazyMedia created from it.
+
+    Attributes
+    ----------
+    fileName : str
+        The name of the JSON file.
+    """
+
+    def __init__(self, fileName):
+        """
+        Initializes the source, the file is only opened on the first read.
+        """
+        self.fileName = fileName
+        self._file = None
+        self._lock = threading.Lock()
+
+    def read(self, offset, length):
+        """
+        Decode the json object stored at the given byte range.
+
+        Parameters
+        ----------
+        offset : int
+            The byte offset of the object.
+        length : int
+            The length of the object in bytes.
+
+        Returns
+        -------
+        dict
+            The decoded json object.
+        """
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.fileName, 'rb')
+            if hasattr(os, 'pread'):
+                raw = os.pread(self._file.fileno(), length, offset)
+            else:
+                self._file.seek(offset)
+                raw = self._file.read(length)
+        return json.loads(raw)
+
+    def __getstate__(self):
+        # The open file and the lock belong to this process, a copy or an
+        # unpickled source opens the file again on its first read.
+        return {'fileName': self.fileName}
+
+    def __setstate__(self, state):
+        self.__init__(state['fileName'])
+
+    def close(self):
+        """
+        Close the underlying file, a later read opens it again.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class LazyMedia:
+    """
+    A stand in for a media that has not been decoded yet.
+
+    It only remembers where its json object lives in the source file.
+    The first time a method or attribute of the media is needed, e.g. play(),
+    info() or title, the object is decoded into the correct Media, Track or
+    Movie, and every later access goes straight to that instance.
+
+    The proxy keeps its own fields private, so that every public name,
+    e.g. length(), belongs to the media.
+
+    Attributes
+    ----------
+    _source : RecordSource
+        The file the json object is read from.
+    _offset : int
+        The byte offset of the json object in the file.
+    _length : int
+        The length of the json object in bytes.
+    """
+
+    __slots__ = ('_source', '_offset', '_length', '_media')
+
+    def __init__(self, source, offset, length):
+        setField = object.__setattr__
+        setField(self, '_source', source)
+        setField(self, '_offset', offset)
+        setField(self, '_length', length)
+        setField(self, '_media', None)
+
+    def isMaterialized(self) -> bool:
+        """
+        Return True if the json object has already been decoded.
+        """
+        return self._media is not None
+
+    def materialize(self):
+        """
+        Decode the json object into its Media, Track or Movie, once.
+
+        Returns
+        -------
+        Media | Track | Movie
+            The concrete media.
+        """
+        media = self._media
+        if media is None:
+            media = mediaFromRecord(self._source.read(self._offset, self._length))
+            self._media = media
+        return media
+
+    def toRecord(self):
+        """
+        Return the media as a json object in the iTunes search format.
+        A proxy that has not been decoded yet is decoded for this call
+        only, so walking a whole playlist, e.g. to export it, does not
+        keep every media in memory.
+        """
+        media = self._media
+        if media is None:
+            media = mediaFromRecord(self._source.read(self._offset, self._length))
+        return media.toRecord()
+
+    def __getattr__(self, name):
+        # Private and special names are never forwarded: an unset slot, e.g.
+        # on a copy made through __new__, would otherwise recurse through
+        # materialize() forever.
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.materialize(), name)
+
+    def __setattr__(self, name, value):
+        if name in LazyMedia.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.materialize(), name, value)
+
+    def __repr__(self):
+        if self._media is None:
+            return f"<LazyMedia {self._source.fileName}@{self._offset}>"
+        return f"<LazyMedia {self._media!r}>"
+
+
+def resolveMedia(media):
+    """
+    Return the concrete media behind a LazyMedia, or the media itself.
+    """
+    if isinstance(media, LazyMedia):
+        return media.materialize()
+    return media
+
+
+if __name__ == "__main__":
+    pass
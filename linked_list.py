@@ -1,3 +1,8 @@
+import time
+import weakref
+import threading
+
+
 class Node:
     """
     A node in a doubly linked list.
@@ -36,6 +41,8 @@ class LinkedList:
         A dummy tail node of the linked list.
     size : int
         The number of elements in the linked list.
+    poolSize : int
+        The maximum number of detached nodes kept for reuse, 0 disables the pool.
 
     Methods
     -------
@@ -60,6 +67,21 @@ class LinkedList:
     deleteAtIndex(index)
         Deletes the node at the specified index from the linked list.
 
+    applyBatch(insertions, deletions)
+        Applies many insertions and deletions in a single pass over the linked list.
+
+    splice(other, after=None)
+        Moves every node of another linked list into this one in O(1).
+
+    splitAt(node)
+        Moves the given node and every node after it into a new linked list.
+
+    removeNode(node)
+        Removes the given node from the linked list in O(1).
+
+    snapshot()
+        Returns an immutable view of the linked list as it is now, in O(1).
+
     printFromFront()
         Prints all elements of the linked list from front to back.
 
@@ -80,17 +102,186 @@ class LinkedList:
         Returns the number of elements in the linked list.
     """
 
-    def __init__(self):
+    def __init__(self, poolSize=0):
         """
         Initializes a LinkedList instance with dummy head and tail nodes and sets size to zero.
         Notice data attribute of the dummyHead and dummyTail is None
+
+        With a poolSize above zero, the nodes detached by popLeft, pop and
+        deleteAtIndex are cleared and kept, up to poolSize of them, and
+        reused by the next insertions instead of allocating new nodes.
+        Callers must then not keep references to nodes after removing them.
+
+        Parameters
+        ----------
+        poolSize : int
+            The maximum number of nodes kept for reuse, default value: 0
         """
         self.dummyHead = Node(None)
         self.dummyTail = Node(None)
         self.dummyHead.next = self.dummyTail
         self.dummyTail.prev = self.dummyHead
         self.size = 0
+        self.poolSize = poolSize
+        self._pool = []
+        # Copy on write state for snapshots: while a snapshot is alive, the
+        # first change of a node after each snapshot saves the node's old
+        # prev, next and data in _history, tagged with the current version.
+        # _writes is odd while a change is in progress, so a snapshot is
+        # never taken in the middle of one. Only snapshots take the lock.
+        self._version = 0
+        self._writes = 0
+        self._liveSnapshots = 0
+        self._snapshots = weakref.WeakSet()
+        self._snapshotVersions = {}
+        self._snapshotLock = threading.RLock()
+        self._history = {}
+
+    def _newNode(self, data):
+        """
+        Return a node holding data, reused from the pool if one is available.
+        """
+        if self._pool:
+            node = self._pool.pop()
+            node.data = data
+            return node
+        return Node(data)
+
+    def _releaseNode(self, node):
+        """
+        Clear a detached node and keep it for reuse, if the pool has room.
+        Without room, or with the pool disabled, the node is left untouched.
+        Nodes are not reused while a snapshot may still reach them.
+        """
+        if len(self._pool) < self.poolSize and not self._liveSnapshots:
+            node.data = None
+            node.prev = None
+            node.next = None
+            self._pool.append(node)
     
+    def _remember(self, *nodes):
+        """
+        Save the current prev, next and data of each node before it is
+        changed, if a snapshot is alive and the node has not been saved
+        since the latest snapshot.
+        """
+        version = self._version
+        history = self._history
+        for node in nodes:
+            entries = history.get(node)
+            if not entries:
+                history[node] = [(version, node.prev, node.next, node.data)]
+            elif entries[-1][0] != version:
+                entries.append((version, node.prev, node.next, node.data))
+
+    def _unlink(self, node):
+        """
+        Remove a node from the linked list and decrease the size by one.
+        The node keeps its prev and next.
+        The caller marks the change as in progress with _writes.
+        """
+        if self._liveSnapshots:
+            self._remember(node.prev, node.next)
+        node.prev.next = node.next
+        node.next.prev = node.prev
+        self.size -= 1
+
+    def removeNode(self, node):
+        """
+        Remove the given node from the linked list in O(1).
+        The node keeps its prev and next, like the nodes removed by Player.removeMedia,
+        and is never put in the node pool.
+
+        Parameters
+        ----------
+        node : Node
+            A node of this linked list, not a dummy node.
+        """
+        self._writes += 1
+        self._unlink(node)
+        self._writes += 1
+
+    def snapshot(self):
+        """
+        Return an immutable view of the linked list as it is now, in O(1).
+        The view can be traversed while the linked list keeps changing,
+        without locks, and always shows the elements at the time it was taken.
+        Changes must come from one thread at a time; any number of threads
+        can take and read snapshots.
+        While a snapshot is alive, every change saves the old links of the
+        nodes it touches, so the extra memory is proportional to the number
+        of changes since the snapshot.
+        Close the snapshot (or let it be garbage collected) to stop that.
+
+        Returns
+        -------
+        LinkedListSnapshot
+            The view of the linked list.
+        """
+        return LinkedListSnapshot(self)
+
+    def _registerSnapshot(self, snapshot):
+        """
+        Start saving changes for a new snapshot.
+        Retries until no change was in progress or started meanwhile, since a
+        change that began before the snapshot was counted may not be saved.
+
+        Returns
+        -------
+        tuple
+            The version and the size of the linked list for the snapshot.
+        """
+        with self._snapshotLock:
+            while True:
+                writes = self._writes
+                if writes % 2 == 0:
+                    self._liveSnapshots += 1
+                    version = self._version
+                    self._version += 1
+                    size = self.size
+                    if self._writes == writes:
+                        break
+                    self._liveSnapshots -= 1
+                time.sleep(0)
+            self._snapshotVersions[version] = self._snapshotVersions.get(version, 0) + 1
+            self._snapshots.add(snapshot)
+        return version, size
+
+    def _releaseSnapshot(self, version):
+        """
+        Forget a closed snapshot and drop the history no snapshot needs anymore.
+        """
+        with self._snapshotLock:
+            count = self._snapshotVersions.get(version)
+            if not count:
+                return
+            if count == 1:
+                del self._snapshotVersions[version]
+            else:
+                self._snapshotVersions[version] = count - 1
+            self._liveSnapshots -= 1
+
+            if not self._liveSnapshots:
+                self._history = {}
+                return
+            # Trim in place, the writer may be appending to these lists.
+            oldest = min(self._snapshotVersions)
+            for entries in list(self._history.values()):
+                stale = 0
+                while stale < len(entries) and entries[stale][0] <= oldest:
+                    stale += 1
+                if stale:
+                    del entries[:stale]
+
+    def _detachSnapshots(self):
+        """
+        Make every live snapshot copy its elements, before nodes are moved
+        to another linked list where their changes would not be saved.
+        """
+        for snapshot in list(self._snapshots):
+            if snapshot._finalizer.alive:
+                snapshot._detach()
+
     def get(self ,index: int) -> int:
         """
         Retrieve the data at the specified index in the linked list.
@@ -139,12 +330,16 @@ class LinkedList:
         -------
         None
         """
-        new_node = Node(data)
+        new_node = self._newNode(data)
+        self._writes += 1
+        if self._liveSnapshots:
+            self._remember(self.dummyHead, self.dummyHead.next)
         new_node.next = self.dummyHead.next
         new_node.prev = self.dummyHead
         self.dummyHead.next.prev = new_node
         self.dummyHead.next = new_node
         self.size += 1
+        self._writes += 1
 
 
     def append(self, data):
@@ -163,12 +358,16 @@ class LinkedList:
         -------
         None
         """
-        new_node = Node(data)
+        new_node = self._newNode(data)
+        self._writes += 1
+        if self._liveSnapshots:
+            self._remember(self.dummyTail, self.dummyTail.prev)
         new_node.next = self.dummyTail
         new_node.prev = self.dummyTail.prev
         self.dummyTail.prev.next = new_node
         self.dummyTail.prev = new_node
         self.size += 1
+        self._writes += 1
 
     
     def popLeft(self):
@@ -191,9 +390,10 @@ class LinkedList:
        
         first_node = self.dummyHead.next
         result = first_node.data
-        self.dummyHead.next = first_node.next
-        first_node.next.prev = self.dummyHead
-        self.size -= 1
+        self._writes += 1
+        self._unlink(first_node)
+        self._releaseNode(first_node)
+        self._writes += 1
         
         return result
 
@@ -217,9 +417,10 @@ class LinkedList:
         
         last_node = self.dummyTail.prev
         result = last_node.data
-        self.dummyTail.prev = last_node.prev
-        last_node.prev.next = self.dummyTail
-        self.size -= 1
+        self._writes += 1
+        self._unlink(last_node)
+        self._releaseNode(last_node)
+        self._writes += 1
         
         return result
             
@@ -245,7 +446,7 @@ class LinkedList:
         if index < 0 or index > self.size:
             return False
         
-        new_node = Node(data)
+        new_node = self._newNode(data)
         if index < self.size // 2:
             current = self.dummyHead
             for _ in range(index):
@@ -259,9 +460,13 @@ class LinkedList:
             new_node.prev = current.prev
             new_node.next = current
         
+        self._writes += 1
+        if self._liveSnapshots:
+            self._remember(new_node.prev, new_node.next)
         new_node.prev.next = new_node
         new_node.next.prev = new_node
         self.size += 1
+        self._writes += 1
         
         return True
 
@@ -296,13 +501,209 @@ class LinkedList:
             for _ in range(self.size - index - 1):
                 current = current.prev
         
-        current.prev.next = current.next
-        current.next.prev = current.prev
-        self.size -= 1
+        self._writes += 1
+        self._unlink(current)
+        self._releaseNode(current)
+        self._writes += 1
         
         return True
 
 
+    def applyBatch(self, insertions=(), deletions=()):
+        """
+        Apply many insertions and deletions in one pass over the linked list,
+        O(n + k log k) for k operations instead of O(n) per operation.
+        Every index refers to the linked list as it was before the batch.
+        An insertion at index i goes before the element that was at index i,
+        insertions at the same index keep their given order, and deleting
+        index i doesn't affect insertions at index i.
+        The result is the same as calling deleteAtIndex and addAtIndex one at
+        a time from the highest index to the lowest, deleting before inserting
+        at the same index and inserting the items of one index in reverse order.
+        If any index is out of range or deleted twice, nothing is changed.
+
+        Each removed node keeps its prev, and its next is set to the node that
+        follows the place it was removed from once the batch is applied
+        (or dummyTail), not counting insertions at its own index.
+
+        Parameters
+        ----------
+        insertions : iterable of (int, any)
+            The index and the data of each node to insert, 0 <= index <= size.
+        deletions : iterable of int
+            The index of each node to delete, 0 <= index < size.
+
+        Returns
+        -------
+        tuple or None
+            The list of inserted nodes and the list of removed nodes, both in
+            list order, or None if the batch is invalid.
+        """
+        insertions = sorted(insertions, key=lambda insertion: insertion[0])
+        deletions = sorted(deletions)
+        for index, _ in insertions:
+            if index < 0 or index > self.size:
+                return None
+        for i, index in enumerate(deletions):
+            if index < 0 or index >= self.size or (i > 0 and deletions[i - 1] == index):
+                return None
+
+        deleted = set(deletions)
+        positions = sorted(deleted.union(index for index, _ in insertions))
+        inserted = []
+        removed = []
+        # Removed nodes whose final successor has not been reached yet.
+        pending = []
+        nextInsertion = 0
+        current = self.dummyHead.next
+        currentIndex = 0
+        self._writes += 1
+        for index in positions:
+            if pending and currentIndex < index:
+                for node in pending:
+                    node.next = current
+                pending = []
+            while currentIndex < index:
+                current = current.next
+                currentIndex += 1
+
+            while nextInsertion < len(insertions) and insertions[nextInsertion][0] == index:
+                new_node = self._newNode(insertions[nextInsertion][1])
+                if self._liveSnapshots:
+                    self._remember(current.prev, current)
+                new_node.prev = current.prev
+                new_node.next = current
+                current.prev.next = new_node
+                current.prev = new_node
+                inserted.append(new_node)
+                nextInsertion += 1
+                for node in pending:
+                    node.next = new_node
+                pending = []
+
+            if index in deleted:
+                following = current.next
+                if self._liveSnapshots:
+                    self._remember(current.prev, current, following)
+                current.prev.next = following
+                following.prev = current.prev
+                removed.append(current)
+                pending.append(current)
+                current = following
+                currentIndex += 1
+
+        for node in pending:
+            node.next = current
+
+        self.size += len(inserted) - len(removed)
+        self._writes += 1
+        return inserted, removed
+
+
+    def splice(self, other, after=None) -> bool:
+        """
+        Move every node of other into this linked list, after the given node
+        (default: at the end), by relinking the boundaries in O(1).
+        other is left empty. Its nodes are moved, not copied, so references
+        to them stay valid.
+
+        Parameters
+        ----------
+        other : LinkedList
+            The linked list to empty into this one.
+        after : Node or None
+            A node of this linked list, or its dummyHead, to insert after.
+            None means after the last node.
+
+        Returns
+        -------
+        bool
+            True if the nodes were moved, False if other is this linked list.
+        """
+        if other is self:
+            return False
+        if other.size == 0:
+            return True
+        if after is None:
+            after = self.dummyTail.prev
+        other._detachSnapshots()
+        self._writes += 1
+        other._writes += 1
+        if self._liveSnapshots:
+            self._remember(after, after.next)
+
+        first = other.dummyHead.next
+        last = other.dummyTail.prev
+        other.dummyHead.next = other.dummyTail
+        other.dummyTail.prev = other.dummyHead
+
+        first.prev = after
+        last.next = after.next
+        after.next.prev = last
+        after.next = first
+        self.size += other.size
+        other.size = 0
+        self._writes += 1
+        other._writes += 1
+        return True
+
+
+    def splitAt(self, node):
+        """
+        Cut the linked list before the given node: the node and every node
+        after it are moved into a new linked list.
+        The relinking is O(1). Only the shorter of the two parts is counted
+        to set the sizes, by walking outwards from the node in both
+        directions at once, so the cost is O(min(left, right)).
+
+        Parameters
+        ----------
+        node : Node
+            A node of this linked list.
+
+        Returns
+        -------
+        LinkedList or None
+            The linked list holding node and the nodes after it, or None if
+            node is a dummy node or has been removed.
+        """
+        if (node is None or node == self.dummyHead or node == self.dummyTail
+                or self._isNodeUnbound(node)):
+            return None
+
+        forward = node
+        backward = node.prev
+        moved = 0
+        kept = 0
+        while True:
+            if forward == self.dummyTail:
+                break
+            if backward == self.dummyHead:
+                moved = self.size - kept
+                break
+            forward = forward.next
+            moved += 1
+            backward = backward.prev
+            kept += 1
+        self._detachSnapshots()
+        self._writes += 1
+        tail = LinkedList(self.poolSize)
+        before = node.prev
+        last = self.dummyTail.prev
+
+        before.next = self.dummyTail
+        self.dummyTail.prev = before
+        node.prev = tail.dummyHead
+        last.next = tail.dummyTail
+        tail.dummyHead.next = node
+        tail.dummyTail.prev = last
+
+        tail.size = moved
+        self.size -= moved
+        self._writes += 1
+        return tail
+
+
     def printFromFront(self):
         """
         Print all elements of the linked list from front to back,
@@ -415,5 +816,140 @@ class LinkedList:
         """
         return self.size
 
+class LinkedListSnapshot:
+    """
+    An immutable view of a LinkedList at the time LinkedList.snapshot()
+    was called. It shares the nodes of the linked list and reads the links
+    saved by later changes, so taking it is O(1) and it can be traversed
+    while the linked list keeps changing.
+
+    Attributes
+    ----------
+    size : int
+        The number of elements in the snapshot.
+
+    Methods
+    -------
+    page(offset, limit)
+        Returns up to limit elements starting at offset.
+
+    close()
+        Releases the snapshot, the linked list stops saving changes for it.
+    """
+
+    def __init__(self, linkedList):
+        """
+        Initializes the snapshot, see LinkedList.snapshot().
+        """
+        self._list = linkedList
+        self._head = linkedList.dummyHead
+        self._tail = linkedList.dummyTail
+        self._items = None
+        self._version, self.size = linkedList._registerSnapshot(self)
+        self._finalizer = weakref.finalize(self, linkedList._releaseSnapshot, self._version)
+
+    def _fields(self, node):
+        """
+        Return the prev, next and data of node at the time of the snapshot.
+        The live fields are read before the history: a writer saves a node
+        before changing it, so a changed field always has a saved entry.
+        """
+        fields = (node.prev, node.next, node.data)
+        entries = self._list._history.get(node)
+        if entries:
+            for entry in tuple(entries):
+                if entry[0] > self._version:
+                    return entry[1:]
+        return fields
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        """
+        Yield the elements from front to back.
+        """
+        if self._items is not None:
+            yield from self._items
+            return
+        self._checkOpen()
+        node = self._fields(self._head)[1]
+        while node is not self._tail:
+            _, following, data = self._fields(node)
+            yield data
+            node = following
+
+    def __reversed__(self):
+        """
+        Yield the elements from back to front.
+        """
+        if self._items is not None:
+            yield from reversed(self._items)
+            return
+        self._checkOpen()
+        node = self._fields(self._tail)[0]
+        while node is not self._head:
+            previous, _, data = self._fields(node)
+            yield data
+            node = previous
+
+    def page(self, offset, limit) -> list:
+        """
+        Return up to limit elements starting at index offset.
+
+        Parameters
+        ----------
+        offset : int
+            The index of the first element.
+        limit : int
+            The maximum number of elements.
+
+        Returns
+        -------
+        list
+            The elements of the page.
+        """
+        result = []
+        if offset < 0 or limit <= 0:
+            return result
+        for index, data in enumerate(self):
+            if index >= offset + limit:
+                break
+            if index >= offset:
+                result.append(data)
+        return result
+
+    def _checkOpen(self):
+        """
+        Raise ValueError if the snapshot was closed, since the history it
+        needs may be gone.
+        """
+        if not self._finalizer.alive:
+            raise ValueError("the snapshot is closed")
+
+    def _detach(self):
+        """
+        Copy the elements out of the linked list and release it.
+        """
+        if self._items is None:
+            self._items = tuple(self)
+            self.close()
+
+    def close(self):
+        """
+        Release the snapshot. Reading it afterwards raises ValueError,
+        unless it had already copied its elements because its nodes were
+        moved to another linked list by splice or splitAt.
+        """
+        self._list._snapshots.discard(self)
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
 if __name__ == "__main__":
     pass
@@ -1,3 +1,38 @@
+from datetime import datetime, timezone
+
+
+def parseReleaseDate(releaseDate):
+    """
+    Convert a release date string into a timestamp in seconds since the epoch.
+    Accepts the ISO format used by the json files, e.g. "2011-07-14T07:00:00Z",
+    and the shorter "2011-07-14" and "2011" forms.
+
+    Parameters
+    ----------
+    releaseDate : str
+        The release date to parse.
+
+    Returns
+    -------
+    int or None
+        The timestamp in UTC, or None if the release date is missing or invalid.
+    """
+    if not isinstance(releaseDate, str):
+        return None
+    text = releaseDate.strip()
+    if len(text) == 4 and text.isdigit():
+        text += "-01-01"
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    try:
+        date = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return int(date.timestamp())
+
+
 class Media:
     """A class representing a media"""
     
@@ -22,11 +57,14 @@ class Media:
         -----------
         self.title 
         self.artist 
+        self.releaseTimestamp
+            The release date in seconds since the epoch, or None if it can't be parsed.
         etc.
         """
         self.title = title
         self.artist = artist
         self.releaseDate = releaseDate
+        self.releaseTimestamp = parseReleaseDate(releaseDate)
         self.url = url
         
 
@@ -49,6 +87,25 @@ class Media:
         """
         return 0
 
+    def durationMillis(self):
+        """
+        Return the exact length of the media in milliseconds,
+        or None since a plain media has no length.
+        """
+        return None
+
+    def toRecord(self):
+        """
+        Return the media as a json object in the iTunes search format,
+        which mediaFromRecord turns back into an equal Media.
+        """
+        return {
+            "collectionName": self.title,
+            "artistName": self.artist,
+            "releaseDate": self.releaseDate,
+            "collectionViewUrl": self.url,
+        }
+
     def play(self):
         """
         Print the content of the media in the standard output.
@@ -123,6 +180,29 @@ class Track(Media):
         """
         return round((self.duration/1000))
 
+    def durationMillis(self):
+        """
+        Return the exact length of the music in milliseconds
+        """
+        return self.duration
+
+    def toRecord(self):
+        """
+        Return the music track as a json object in the iTunes search format,
+        which mediaFromRecord turns back into an equal Track.
+        """
+        return {
+            "wrapperType": "track",
+            "kind": "song",
+            "trackName": self.title,
+            "artistName": self.artist,
+            "releaseDate": self.releaseDate,
+            "trackViewUrl": self.url,
+            "collectionName": self.album,
+            "primaryGenreName": self.genre,
+            "trackTimeMillis": self.duration,
+        }
+
     def play(self):
         """
         Print the content of the music track in the standard output.
@@ -194,6 +274,28 @@ class Movie(Media):
         Notice the length in the provide json might not in minutes
         """
         return round((self.movieLength/60000))
+
+    def durationMillis(self):
+        """
+        Return the exact length of the movie in milliseconds
+        """
+        return self.movieLength
+
+    def toRecord(self):
+        """
+        Return the movie as a json object in the iTunes search format,
+        which mediaFromRecord turns back into an equal Movie.
+        """
+        return {
+            "wrapperType": "track",
+            "kind": "feature-movie",
+            "trackName": self.title,
+            "artistName": self.artist,
+            "releaseDate": self.releaseDate,
+            "trackViewUrl": self.url,
+            "contentAdvisoryRating": self.rating,
+            "trackTimeMillis": self.movieLength,
+        }
         
 
     def play(self):
@@ -207,5 +309,49 @@ class Movie(Media):
         """
         return print(f"{self.title} by {self.artist} ({self.releaseDate}) [{self.rating}] length: {self.length()} mins")
 
+def mediaFromRecord(item):
+    """
+    Create the correct instance type (Movie, Track or Media) from one json
+    object of the iTunes search format.
+    A json object that is neither a song nor a feature movie is a Media.
+
+    Parameters
+    ----------
+    item : dict
+        The decoded json object.
+
+    Returns
+    -------
+    Media | Track | Movie
+        The media described by the json object.
+    """
+    if item.get('wrapperType') == 'track':
+        if item.get('kind') == 'feature-movie':
+            return Movie(
+                title=item.get('trackName', 'No Title'),
+                artist=item.get('artistName', 'No Artist'),
+                releaseDate=item.get('releaseDate', 'No Release Date'),
+                url=item.get('trackViewUrl', 'No URL'),
+                rating=item.get('contentAdvisoryRating', 'No Rating'),
+                movieLength=item.get('trackTimeMillis', 0)
+            )
+        elif item.get('kind') == 'song':
+            return Track(
+                title=item.get('trackName', 'No Title'),
+                artist=item.get('artistName', 'No Artist'),
+                releaseDate=item.get('releaseDate', 'No Release Date'),
+                url=item.get('trackViewUrl', 'No URL'),
+                album=item.get('collectionName', 'No Album'),
+                genre=item.get('primaryGenreName', 'No Genre'),
+                duration=item.get('trackTimeMillis', 0)
+            )
+
+    return Media(
+        title=item.get('collectionName'),
+        artist=item.get('artistName'),
+        releaseDate=item.get('releaseDate'),
+        url=item.get('collectionViewUrl')
+    )
+
 if __name__ == "__main__":
     pass
\ No newline at end of file
@@ -0,0 +1,635 @@
+import re
+import sys
+from math import log
+from collections import deque
+from heapq import heapify, heappush, heappop
+from operator import itemgetter
+from bisect import bisect_left, bisect_right
+
+_TOKEN = re.compile(r"\w+")
+
+
+class SortedIndex:
+    """
+    An ordered secondary index from a numeric key to playlist nodes.
+
+    The keys and the nodes are kept in two parallel lists sorted by key,
+    so lookups are a binary search and a range of k nodes is a slice.
+    Nodes with equal keys keep the order they were added in.
+    A node whose key is None is not indexed.
+
+    Attributes
+    ----------
+    keyOf : callable
+        Returns the key of a media, or None.
+
+    Methods
+    -------
+    add(node)
+        Adds a playlist node to the index.
+
+    addAll(nodes)
+        Adds many playlist nodes to the index with one sort.
+
+    remove(node)
+        Removes a playlist node from the index.
+
+    range(low=None, high=None)
+        Returns the nodes with low <= key < high in key order.
+
+    smallest(k)
+        Returns the k nodes with the smallest keys.
+
+    largest(k)
+        Returns the k nodes with the largest keys, largest first.
+
+    nodeKey(node)
+        Returns the key a node was indexed under.
+    """
+
+    def __init__(self, keyOf):
+        """
+        Initializes an empty index.
+
+        Parameters
+        ----------
+        keyOf : callable
+            Called with the media of a node, returns its key or None.
+        """
+        self.keyOf = keyOf
+        self._keys = []
+        self._nodes = []
+        self._nodeKeys = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def nodeKey(self, node):
+        """
+        Return the key a node was indexed under, or None if it isn't indexed.
+        """
+        return self._nodeKeys.get(node)
+
+    def add(self, node):
+        """
+        Add a playlist node to the index, O(log n) search plus a list insert.
+
+        Parameters
+        ----------
+        node : Node
+            The node to index, its data is the media.
+        """
+        key = self.keyOf(node.data)
+        if key is None:
+            return
+        position = bisect_right(self._keys, key)
+        self._keys.insert(position, key)
+        self._nodes.insert(position, node)
+        self._nodeKeys[node] = key
+
+    def addAll(self, nodes):
+        """
+        Add many playlist nodes to the index, O((n + k) log(n + k)) for k nodes
+        instead of one list insert per node. Used to build the index in bulk,
+        add() keeps it up to date afterwards.
+        Nodes with equal keys keep their order, after the nodes already indexed.
+
+        Parameters
+        ----------
+        nodes : iterable of Node
+            The nodes to index, in playlist order.
+        """
+        keyOf = self.keyOf
+        pairs = list(zip(self._keys, self._nodes))
+        for node in nodes:
+            key = keyOf(node.data)
+            if key is not None:
+                pairs.append((key, node))
+                self._nodeKeys[node] = key
+        pairs.sort(key=itemgetter(0))
+        self._keys = [key for key, _ in pairs]
+        self._nodes = [node for _, node in pairs]
+
+    def remove(self, node) -> bool:
+        """
+        Remove a playlist node from the index.
+        The node is found by the key it had when it was added.
+
+        Parameters
+        ----------
+        node : Node
+            The node to remove.
+
+        Returns
+        -------
+        bool
+            True if the node was in the index, False otherwise.
+        """
+        key = self._nodeKeys.pop(node, None)
+        if key is None:
+            return False
+        position = bisect_left(self._keys, key)
+        end = bisect_right(self._keys, key, position)
+        for i in range(position, end):
+            if self._nodes[i] is node:
+                del self._keys[i]
+                del self._nodes[i]
+                return True
+        return False
+
+    def range(self, low=None, high=None):
+        """
+        Return the nodes whose key is in [low, high), in key order.
+        O(log n + k) for k results.
+
+        Parameters
+        ----------
+        low : int or None
+            The smallest key to include, None means no lower bound.
+        high : int or None
+            The first key to exclude, None means no upper bound.
+
+        Returns
+        -------
+        list
+            The matching nodes.
+        """
+        start = 0 if low is None else bisect_left(self._keys, low)
+        end = len(self._keys) if high is None else bisect_left(self._keys, high)
+        return self._nodes[start:end]
+
+    def smallest(self, k):
+        """
+        Return the k nodes with the smallest keys, smallest first. O(k).
+        """
+        return self._nodes[:max(k, 0)]
+
+    def largest(self, k):
+        """
+        Return the k nodes with the largest keys, largest first. O(k).
+        """
+        if k <= 0:
+            return []
+        return self._nodes[:-k - 1:-1]
+
+
+def tokenize(text):
+    """
+    Split a text into lower case word tokens.
+
+    Parameters
+    ----------
+    text : str or None
+        The text to split.
+
+    Returns
+    -------
+    list
+        The tokens in order, None gives an empty list.
+    """
+    if not text:
+        return []
+    return _TOKEN.findall(text.lower())
+
+
+class SearchIndex:
+    """
+    A full text index over the title, artist and album of playlist media.
+
+    An inverted index maps each token to the nodes containing it and how
+    often, and a character trie over the tokens finds every token that
+    starts with a prefix, which makes search as you type cheap.
+    The few nodes holding a token more than once are also kept in buckets
+    by count. All the nodes in the same bucket of every query term have
+    the same score, so a query visits these groups best score first and
+    stops as soon as it has found enough nodes.
+
+    Attributes
+    ----------
+    maxExpansions : int
+        The maximum number of tokens the prefix of a query is expanded into,
+        shortest first.
+
+    Methods
+    -------
+    add(node)
+        Adds a playlist node to the index.
+
+    addAll(nodes)
+        Adds many playlist nodes to the index.
+
+    remove(node)
+        Removes a playlist node from the index.
+
+    search(query, limit=10)
+        Returns the best matching nodes for a query.
+
+    memoryReport()
+        Returns an estimate of the memory used by the index.
+    """
+
+    _END = ""
+
+    def __init__(self, maxExpansions=64):
+        """
+        Initializes an empty index.
+
+        Parameters
+        ----------
+        maxExpansions : int
+            The maximum number of tokens a prefix is expanded into, default value: 64
+        """
+        self.maxExpansions = maxExpansions
+        self._postings = {}
+        # token -> {count: {node: None}} for the nodes holding the token at least twice
+        self._repeats = {}
+        self._nodeTokens = {}
+        self._trie = {}
+
+    def __len__(self):
+        return len(self._nodeTokens)
+
+    @staticmethod
+    def _tokensOf(media):
+        """
+        Return the tokens of the searchable fields of a media.
+        """
+        return (tokenize(getattr(media, "title", None))
+                + tokenize(getattr(media, "artist", None))
+                + tokenize(getattr(media, "album", None)))
+
+    def add(self, node):
+        """
+        Add a playlist node to the index, O(number of tokens).
+
+        Parameters
+        ----------
+        node : Node
+            The node to index, its data is the media.
+        """
+        # Intern the tokens, so the postings, the trie walk and every node
+        # share one string per distinct token.
+        tokens = [sys.intern(token) for token in self._tokensOf(node.data)]
+        if not tokens:
+            return
+        self._nodeTokens[node] = tokens
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                self._trieInsert(token)
+            count = postings.get(node, 0) + 1
+            postings[node] = count
+            if count > 1:
+                repeats = self._repeats.get(token)
+                if repeats is None:
+                    repeats = self._repeats[token] = {}
+                if count > 2:
+                    self._unbucket(repeats, count - 1, node)
+                bucket = repeats.get(count)
+                if bucket is None:
+                    bucket = repeats[count] = {}
+                bucket[node] = None
+
+    def addAll(self, nodes):
+        """
+        Add many playlist nodes to the index, see add().
+
+        Parameters
+        ----------
+        nodes : iterable of Node
+            The nodes to index.
+        """
+        for node in nodes:
+            self.add(node)
+
+    def remove(self, node) -> bool:
+        """
+        Remove a playlist node from the index, using the tokens it had when it was added.
+
+        Parameters
+        ----------
+        node : Node
+            The node to remove.
+
+        Returns
+        -------
+        bool
+            True if the node was in the index, False otherwise.
+        """
+        tokens = self._nodeTokens.pop(node, None)
+        if tokens is None:
+            return False
+        for token in set(tokens):
+            postings = self._postings[token]
+            count = postings.pop(node)
+            if count > 1:
+                repeats = self._repeats[token]
+                self._unbucket(repeats, count, node)
+                if not repeats:
+                    del self._repeats[token]
+            if not postings:
+                del self._postings[token]
+                self._trieRemove(token)
+        return True
+
+    @staticmethod
+    def _unbucket(repeats, count, node):
+        """
+        Remove a node from the bucket of a count, and the bucket if it is left empty.
+        """
+        bucket = repeats[count]
+        del bucket[node]
+        if not bucket:
+            del repeats[count]
+
+    def _counts(self, token):
+        """
+        Return the counts a node can hold the token with, highest first.
+        """
+        repeats = self._repeats.get(token)
+        if not repeats:
+            return (1,)
+        return tuple(sorted(repeats, reverse=True)) + (1,)
+
+    def _bucketSize(self, token, count):
+        """
+        Return the number of nodes holding the token exactly count times.
+        """
+        repeats = self._repeats.get(token)
+        if count > 1:
+            return len(repeats[count])
+        size = len(self._postings[token])
+        if repeats:
+            size -= sum(len(bucket) for bucket in repeats.values())
+        return size
+
+    def _bucket(self, token, count):
+        """
+        Iterate the nodes holding the token exactly count times.
+        """
+        if count > 1:
+            return iter(self._repeats[token][count])
+        return (node for node, held in self._postings[token].items() if held == 1)
+
+    def _matches(self, branches, expansions, branch, driver, count):
+        """
+        Walk the nodes holding the term number driver of a branch count
+        times, yielding (branch, counts, node) for every branch the node
+        matches, counts being how many times it holds each term of the branch.
+
+        The terms before the prefix are the same in every branch, so when
+        one of them drives, the walk serves every branch. expansions maps
+        the tokens standing in for the prefix to their branch, it is None
+        when the query has no prefix.
+        """
+        terms = branches[branch]
+        exactCount = len(terms) if expansions is None else len(terms) - 1
+        shared = expansions is not None and driver < exactCount
+        others = [(i, postings) for i, (_, postings, _) in enumerate(terms[:exactCount]) if i != driver]
+        for node in self._bucket(terms[driver][0], count):
+            counts = [count] * len(terms)
+            for i, postings in others:
+                held = postings.get(node)
+                if held is None:
+                    break
+                counts[i] = held
+            else:
+                if not shared:
+                    yield branch, tuple(counts), node
+                    continue
+                for token in dict.fromkeys(self._nodeTokens[node]):
+                    match = expansions.get(token)
+                    if match is not None:
+                        counts[-1] = self._postings[token][node]
+                        yield match, tuple(counts), node
+
+    def _trieInsert(self, token):
+        """
+        Add a token to the trie.
+        """
+        trieNode = self._trie
+        for char in token:
+            child = trieNode.get(char)
+            if child is None:
+                child = trieNode[char] = {}
+            trieNode = child
+        trieNode[self._END] = True
+
+    def _trieRemove(self, token):
+        """
+        Remove a token from the trie and prune the branches left empty.
+        """
+        path = [self._trie]
+        for char in token:
+            path.append(path[-1][char])
+        del path[-1][self._END]
+        for depth in range(len(token), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][token[depth - 1]]
+
+    def expand(self, prefix, limit=None) -> list:
+        """
+        Return the indexed tokens that start with prefix, at most limit of
+        them, shortest first.
+
+        Parameters
+        ----------
+        prefix : str
+            A lower case prefix.
+        limit : int or None
+            The maximum number of tokens, None means maxExpansions.
+
+        Returns
+        -------
+        list
+            The matching tokens.
+        """
+        if limit is None:
+            limit = self.maxExpansions
+        trieNode = self._trie
+        for char in prefix:
+            trieNode = trieNode.get(char)
+            if trieNode is None:
+                return []
+        tokens = []
+        queue = deque([(trieNode, prefix)])
+        while queue and len(tokens) < limit:
+            trieNode, word = queue.popleft()
+            for char, child in trieNode.items():
+                if char == self._END:
+                    tokens.append(word)
+                else:
+                    queue.append((child, word + char))
+        return tokens[:limit]
+
+    def search(self, query, limit=10) -> list:
+        """
+        Return the nodes matching every term of the query, best match first.
+        Unless the query ends with a space, its last term is a prefix,
+        so "green da" finds "Green Day"; it matches the first maxExpansions
+        tokens starting with it, shortest first.
+
+        A node scores count * idf summed over the exact terms, plus the
+        best count * idf among the expansions of the prefix it holds.
+        The nodes holding every term a given number of times, with one
+        expansion standing in for the prefix, all score the same.
+        Those groups are visited best score first, each by walking its
+        smallest bucket and looking the nodes up in the others, until
+        limit nodes are found. A bucket is walked once: the nodes it
+        yields for another group are set aside for when that group's turn comes.
+
+        Parameters
+        ----------
+        query : str
+            The text typed by the user.
+        limit : int
+            The maximum number of nodes to return, default value: 10
+
+        Returns
+        -------
+        list
+            The matching nodes.
+        """
+        terms = tokenize(query)
+        if not terms or limit <= 0:
+            return []
+        prefix = terms.pop() if not query[-1].isspace() else None
+
+        total = len(self._nodeTokens)
+        exact = []
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                return []
+            exact.append((term, postings, log(1 + total / len(postings))))
+
+        if prefix is None:
+            branches = [exact]
+            expansions = None
+        else:
+            branches = []
+            expansions = {}
+            for token in self.expand(prefix):
+                expansions[token] = len(branches)
+                postings = self._postings[token]
+                branches.append(exact + [(token, postings, log(1 + total / len(postings)))])
+            if not branches:
+                return []
+
+        # Best first enumeration of one count per term, for every branch.
+        # A group only raises the count of terms at or after the one its
+        # parent raised, so every group is pushed once.
+        countLists = []
+        groups = []
+        for branch, branchTerms in enumerate(branches):
+            counts = [self._counts(token) for token, _, _ in branchTerms]
+            countLists.append(counts)
+            group = tuple(termCounts[0] for termCounts in counts)
+            score = sum(count * idf for count, (_, _, idf) in zip(group, branchTerms))
+            groups.append((-score, branch, (0,) * len(group), group, 0))
+        heapify(groups)
+
+        results = []
+        found = set()
+        sizes = {}
+        cursors = {}
+        pending = {}
+        while groups and len(results) < limit:
+            negativeScore, branch, positions, group, raised = heappop(groups)
+            branchTerms = branches[branch]
+            counts = countLists[branch]
+            for i in range(raised, len(positions)):
+                position = positions[i] + 1
+                if position < len(counts[i]):
+                    count = counts[i][position]
+                    heappush(groups, (negativeScore + (group[i] - count) * branchTerms[i][2], branch,
+                                      positions[:i] + (position,) + positions[i + 1:],
+                                      group[:i] + (count,) + group[i + 1:], i))
+
+            for node in pending.pop((branch, group), ()):
+                if node not in found:
+                    found.add(node)
+                    results.append(node)
+                    if len(results) == limit:
+                        return results
+
+            driver = None
+            for i, ((token, _, _), count) in enumerate(zip(branchTerms, group)):
+                size = sizes.get((token, count))
+                if size is None:
+                    size = sizes[token, count] = self._bucketSize(token, count)
+                if driver is None or size < smallest:
+                    driver, smallest = i, size
+            if smallest == 0:
+                continue
+            if expansions is not None and driver < len(exact):
+                key = (driver, group[driver])
+            else:
+                key = (branch, driver, group[driver])
+            cursor = cursors.get(key)
+            if cursor is None:
+                cursor = cursors[key] = self._matches(branches, expansions, branch, driver, group[driver])
+            for matchBranch, matchGroup, node in cursor:
+                if matchBranch != branch or matchGroup != group:
+                    pending.setdefault((matchBranch, matchGroup), []).append(node)
+                elif node not in found:
+                    found.add(node)
+                    results.append(node)
+                    if len(results) == limit:
+                        break
+        return results
+
+    def memoryReport(self) -> dict:
+        """
+        Estimate the memory used by the index itself, not counting the
+        nodes and media it refers to.
+
+        Returns
+        -------
+        dict
+            The number of tokens, postings, trie nodes and indexed nodes, and the
+            estimated bytes of the token strings, the postings with their count
+            buckets, the trie and the per node token lists.
+        """
+        tokenBytes = 0
+        postingBytes = sys.getsizeof(self._postings) + sys.getsizeof(self._repeats)
+        postingCount = 0
+        for token, postings in self._postings.items():
+            tokenBytes += sys.getsizeof(token)
+            postingBytes += sys.getsizeof(postings)
+            postingCount += len(postings)
+        for repeats in self._repeats.values():
+            postingBytes += sys.getsizeof(repeats)
+            for bucket in repeats.values():
+                postingBytes += sys.getsizeof(bucket)
+
+        trieBytes = 0
+        trieNodes = 0
+        stack = [self._trie]
+        while stack:
+            trieNode = stack.pop()
+            trieNodes += 1
+            trieBytes += sys.getsizeof(trieNode)
+            stack.extend(child for char, child in trieNode.items() if char != self._END)
+
+        tokenListBytes = sys.getsizeof(self._nodeTokens)
+        for tokens in self._nodeTokens.values():
+            tokenListBytes += sys.getsizeof(tokens)
+
+        return {
+            "nodes": len(self._nodeTokens),
+            "tokens": len(self._postings),
+            "postings": postingCount,
+            "trieNodes": trieNodes,
+            "tokenBytes": tokenBytes,
+            "postingBytes": postingBytes,
+            "trieBytes": trieBytes,
+            "tokenListBytes": tokenListBytes,
+            "totalBytes": tokenBytes + postingBytes + trieBytes + tokenListBytes,
+        }
+
+
+if __name__ == "__main__":
+    pass
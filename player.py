@@ -1,6 +1,10 @@
-from media import Media, Track, Movie
-from linked_list import LinkedList
+from media import Track, Movie, mediaFromRecord, parseReleaseDate
+from linked_list import LinkedList, LinkedListSnapshot
+from lazy_media import LazyMedia, RecordSource, scanRecordOffsets, resolveMedia
+from media_index import SortedIndex, SearchIndex
+from heapq import merge
 import json
+import math
 class Player:
     """
     A media player class that manages a playlist of media.
@@ -14,14 +18,39 @@ class Player:
         A doubly linked list that stores the media in the playlist.
     currentMediaNode : Node or None
         The current media being played, represented as a node in the linked list.
+
+    Observers added with addObserver are called after every change of the
+    playlist or of the currentMediaNode as observer(event, *args), with:
+        "add", media
+        "remove", index, node
+        "batch", insertions, deletions (as passed to applyBatch, with media)
+        "merge", mediaList, afterCurrent
+        "split"
+        "clear" (when the playlist was moved into another player)
+        "next", "prev", "reset"
+        "jump", node
     """
 
+    # The secondary indexes a Player can build, by name, with the factory
+    # that creates each one. An index is built on its first query and kept
+    # up to date by every later mutation of the playlist.
+    INDEX_TYPES = {
+        "releaseDate": lambda: SortedIndex(lambda media: getattr(media, "releaseTimestamp", None)),
+        "trackLength": lambda: SortedIndex(
+            lambda media: media.durationMillis() if isinstance(resolveMedia(media), Track) else None),
+        "movieLength": lambda: SortedIndex(
+            lambda media: media.durationMillis() if isinstance(resolveMedia(media), Movie) else None),
+        "search": SearchIndex,
+    }
+
     def __init__(self):
         """
         Initializes the Player with an empty playlist and None as currentMediaNode.
         """
         self.playlist = LinkedList()
         self.currentMediaNode = None
+        self._indexes = {}
+        self._observers = []
 
     def addMedia(self, media):
         """
@@ -37,6 +66,10 @@ class Player:
         self.playlist.append(media)
         if not self.currentMediaNode:
             self.currentMediaNode = self.playlist.dummyHead.next
+        for index in self._indexes.values():
+            index.add(self.playlist.dummyTail.prev)
+        if self._observers:
+            self._notify("add", media)
 
     def removeMedia(self, index) -> bool:
         """
@@ -65,12 +98,196 @@ class Player:
         if self.currentMediaNode == current:
             self.currentMediaNode = current.next if current.next != self.playlist.dummyTail else None
 
-        current.prev.next = current.next
-        current.next.prev = current.prev
-        self.playlist.size -= 1
+        self.playlist.removeNode(current)
+        for mediaIndex in self._indexes.values():
+            mediaIndex.remove(current)
+        if self._observers:
+            self._notify("remove", index, current)
 
         return True
 
+    def applyBatch(self, insertions=(), deletions=()) -> bool:
+        """
+        Inserts and removes many media in a single pass over the playlist,
+        see LinkedList.applyBatch for how the indexes are interpreted.
+        Inserted items can be Media instances or json objects in the format
+        of insert_data.json, which are turned into the correct media type.
+        If the currentMediaNode is removed, it moves to the media that now
+        follows it, or to None if no media follows, like in removeMedia.
+        Otherwise it stays on the same media. If the playlist was empty, the
+        first inserted media becomes the currentMediaNode, like in addMedia.
+
+        Parameters
+        ----------
+        insertions : iterable of (int, Media | dict)
+            The index, before the batch, and the media or json object to insert there.
+        deletions : iterable of int
+            The index, before the batch, of each media to remove.
+
+        Returns
+        -------
+        bool
+            True if the batch was applied, False if an index is invalid.
+        """
+        insertions = [(index, mediaFromRecord(item) if isinstance(item, dict) else item)
+                      for index, item in insertions]
+        deletions = list(deletions)
+        wasEmpty = self.playlist.size == 0
+        result = self.playlist.applyBatch(insertions, deletions)
+        if result is None:
+            return False
+        inserted, removed = result
+
+        if self.currentMediaNode and self.playlist._isNodeUnbound(self.currentMediaNode):
+            following = self.currentMediaNode.next
+            self.currentMediaNode = following if following != self.playlist.dummyTail else None
+        if wasEmpty and self.playlist.size > 0:
+            self.currentMediaNode = self.playlist.dummyHead.next
+
+        for index in self._indexes.values():
+            for node in removed:
+                index.remove(node)
+            for node in inserted:
+                index.add(node)
+        if self._observers:
+            self._notify("batch", insertions, deletions)
+        return True
+
+    def mergePlaylist(self, other, afterCurrent=False) -> bool:
+        """
+        Moves every media of another player into this playlist, at the end
+        or right after the currentMediaNode (e.g. to queue a whole album next).
+        The nodes are relinked in O(1), the other player is left empty.
+        Built indexes of this player are updated for the moved media,
+        which costs O(k) only if an index has been built.
+
+        Parameters
+        ----------
+        other : Player
+            The player whose playlist is moved into this one.
+        afterCurrent : bool
+            Insert after the currentMediaNode instead of at the end,
+            default value: False
+
+        Returns
+        -------
+        bool
+            True if the media were moved, False if other is this player.
+        """
+        if other is self:
+            return False
+        if self._observers:
+            mediaList = []
+            node = other.playlist.dummyHead.next
+            while node != other.playlist.dummyTail:
+                mediaList.append(node.data)
+                node = node.next
+        first = other.playlist.dummyHead.next
+        last = other.playlist.dummyTail.prev
+        moved = other.playlist.size
+        after = self.currentMediaNode if afterCurrent and self.currentMediaNode else None
+        self.playlist.splice(other.playlist, after)
+        other.currentMediaNode = None
+        other._indexes = {}
+        if moved and other._observers:
+            other._notify("clear")
+
+        if moved:
+            if not self.currentMediaNode:
+                self.currentMediaNode = self.playlist.dummyHead.next
+            if self._indexes:
+                node = first
+                while True:
+                    for index in self._indexes.values():
+                        index.add(node)
+                    if node == last:
+                        break
+                    node = node.next
+        if self._observers:
+            self._notify("merge", mediaList, afterCurrent)
+        return True
+
+    def splitAtCurrent(self):
+        """
+        Moves the currentMediaNode and every media after it into a new
+        Player (e.g. to save the rest as a new playlist), in O(1) plus
+        counting the shorter part. This player keeps the media before it,
+        and its currentMediaNode becomes its last media, or None.
+        Built indexes of this player drop the moved media, which costs
+        O(k) only if an index has been built.
+
+        Returns
+        -------
+        Player or None
+            The new player, whose currentMediaNode is its first media,
+            or None if there is no current media.
+        """
+        if not self.currentMediaNode:
+            return None
+        node = self.currentMediaNode
+        rest = self.playlist.splitAt(node)
+        if rest is None:
+            return None
+
+        player = Player()
+        player.playlist = rest
+        player.currentMediaNode = node
+        self.currentMediaNode = self.playlist.dummyTail.prev if self.playlist.size > 0 else None
+
+        if self._indexes:
+            while node != rest.dummyTail:
+                for index in self._indexes.values():
+                    index.remove(node)
+                node = node.next
+        if self._observers:
+            self._notify("split")
+        return player
+
+
+    def addObserver(self, observer):
+        """
+        Registers a callable to be notified of every change, see the class docstring.
+
+        Parameters
+        ----------
+        observer : callable
+            Called as observer(event, *args).
+        """
+        self._observers.append(observer)
+
+    def removeObserver(self, observer) -> bool:
+        """
+        Unregisters an observer added with addObserver.
+
+        Returns
+        -------
+        bool
+            True if the observer was registered, False otherwise.
+        """
+        if observer in self._observers:
+            self._observers.remove(observer)
+            return True
+        return False
+
+    def _notify(self, event, *args):
+        """
+        Call every observer with the event and its arguments.
+        """
+        for observer in list(self._observers):
+            observer(event, *args)
+
+    def snapshot(self):
+        """
+        Returns an immutable view of the playlist and of the current media,
+        taken in O(1). Readers can iterate, page or play it without locks
+        while this player keeps being changed, see LinkedList.snapshot().
+
+        Returns
+        -------
+        PlaylistSnapshot
+            The view of the playlist.
+        """
+        return PlaylistSnapshot(self)
 
     def next(self) -> bool:
         """
@@ -84,6 +301,8 @@ class Player:
         """
         if self.currentMediaNode and self.currentMediaNode.next != self.playlist.dummyTail:
             self.currentMediaNode = self.currentMediaNode.next
+            if self._observers:
+                self._notify("next")
             return True
         return False
 
@@ -99,6 +318,8 @@ class Player:
         """
         if self.currentMediaNode and self.currentMediaNode.prev != self.playlist.dummyHead:
             self.currentMediaNode = self.currentMediaNode.prev
+            if self._observers:
+                self._notify("prev")
             return True
         return False
 
@@ -114,6 +335,8 @@ class Player:
         """
         if self.playlist.size > 0:
             self.currentMediaNode = self.playlist.dummyHead.next
+            if self._observers:
+                self._notify("reset")
             return True
         return False
 
@@ -162,7 +385,7 @@ class Player:
                 current.data.play()
                 current = current.prev
 
-    def loadFromJson(self, fileName):
+    def loadFromJson(self, fileName, lazy=False, searchable=False):
         """
         Loads media from a JSON file and adds them to the playlist.
         The order should be the same as the provided json file. 
@@ -177,43 +400,335 @@ class Player:
         if there is at least one media in the playlist.
         Remeber to use the dictionary get method. 
 
+        With lazy set to True, only the byte range of each json object is
+        recorded and the playlist holds LazyMedia, which are turned into their
+        Media, Track or Movie the first time they are played or inspected.
+        This skips decoding the file up front, so the playlist is ready sooner
+        and holds far less memory, and each media pays its decoding on first use.
+        With searchable set to True, the search index is built while loading
+        instead of on the first call to search. Indexing reads the title,
+        artist and album of every media, so together with lazy it decodes
+        every record during the load and keeps them decoded.
+
         Parameters
         ----------
         filename : str
             The name of the JSON file to load media from.
+        lazy : bool
+            Whether to defer creating the media until first use, default value: False
+        searchable : bool
+            Whether to build the search index while loading, default value: False.
+            With lazy, this decodes every media during the load.
+        """
+        if searchable:
+            self._getIndex("search")
+        if lazy:
+            source = RecordSource(fileName)
+            for offset, length in scanRecordOffsets(fileName):
+                self.addMedia(LazyMedia(source, offset, length))
+        else:
+            with open(fileName, 'r') as file:
+                data = json.load(file)
+                for item in data:
+                    self.addMedia(mediaFromRecord(item))
+
+        if self.playlist.size > 0:
+            self.resetCurrentMediaNode()
+
+    def loadFromRecords(self, records):
+        """
+        Adds media from json objects in the iTunes search format, e.g. the
+        records read back by exporters.readNdjson or exporters.readCsv,
+        the same way as loadFromJson.
+
+        Parameters
+        ----------
+        records : iterable of dict
+            The json objects, consumed one at a time.
         """
-        with open(fileName, 'r') as file:
-            data = json.load(file)
-            for item in data:
-                media = Media(
-                    title=item.get('collectionName'),
-                    artist=item.get('artistName'),
-                    releaseDate=item.get('releaseDate'),
-                    url=item.get('collectionViewUrl')
-                )
-                
-                if item.get('wrapperType') == 'track':
-                    if item.get('kind') == 'feature-movie':
-                        media = Movie(
-                            title=item.get('trackName', 'No Title'),
-                            artist=item.get('artistName', 'No Artist'),
-                            releaseDate=item.get('releaseDate', 'No Release Date'),
-                            url=item.get('trackViewUrl', 'No URL'),
-                            rating=item.get('contentAdvisoryRating', 'No Rating'),
-                            movieLength=item.get('trackTimeMillis', 0)
-                        )
-                    elif item.get('kind') == 'song':
-                        media = Track(
-                            title=item.get('trackName', 'No Title'),
-                            artist=item.get('artistName', 'No Artist'),
-                            releaseDate=item.get('releaseDate', 'No Release Date'),
-                            url=item.get('trackViewUrl', 'No URL'),
-                            album=item.get('collectionName', 'No Album'),
-                            genre=item.get('primaryGenreName', 'No Genre'),
-                            duration=item.get('trackTimeMillis', 0)
-                        )
-
-                self.addMedia(media)
+        for item in records:
+            self.addMedia(mediaFromRecord(item))
 
         if self.playlist.size > 0:
             self.resetCurrentMediaNode()
+
+    def _getIndex(self, name):
+        """
+        Return the secondary index with the given name, building it from the
+        playlist the first time it is needed.
+
+        Parameters
+        ----------
+        name : str
+            A key of Player.INDEX_TYPES.
+
+        Returns
+        -------
+        SortedIndex | SearchIndex
+            The index, kept up to date by addMedia and removeMedia.
+        """
+        index = self._indexes.get(name)
+        if index is None:
+            index = self.INDEX_TYPES[name]()
+            index.addAll(self._iterNodes())
+            self._indexes[name] = index
+        return index
+
+    def _iterNodes(self):
+        """
+        Yield the nodes of the playlist from front to back.
+        """
+        current = self.playlist.dummyHead.next
+        while current != self.playlist.dummyTail:
+            yield current
+            current = current.next
+
+    def releasedBetween(self, start=None, end=None) -> list:
+        """
+        Returns the nodes of the media released in [start, end), oldest first.
+        Media without a valid release date are never returned.
+        A date string that can't be parsed raises ValueError.
+
+        Parameters
+        ----------
+        start : str or int or None
+            The first release date to include, as a date string
+            (e.g. "1999" or "1999-03-31") or a timestamp. None means no lower bound.
+        end : str or int or None
+            The first release date to exclude, same formats as start.
+            None means no upper bound.
+
+        Returns
+        -------
+        list
+            The playlist nodes, ready to become currentMediaNode.
+        """
+        if isinstance(start, str):
+            bound, start = start, parseReleaseDate(start)
+            if start is None:
+                raise ValueError(f"invalid release date: {bound!r}")
+        if isinstance(end, str):
+            bound, end = end, parseReleaseDate(end)
+            if end is None:
+                raise ValueError(f"invalid release date: {bound!r}")
+        return self._getIndex("releaseDate").range(start, end)
+
+    def releasedInYear(self, year) -> list:
+        """
+        Returns the nodes of the media released in the given year, oldest first.
+
+        Parameters
+        ----------
+        year : int
+            The release year.
+
+        Returns
+        -------
+        list
+            The playlist nodes.
+        """
+        return self.releasedBetween(f"{year:04d}", f"{year + 1:04d}")
+
+    def newest(self, k) -> list:
+        """
+        Returns the nodes of the k most recently released media, newest first.
+
+        Parameters
+        ----------
+        k : int
+            The number of media to return.
+
+        Returns
+        -------
+        list
+            The playlist nodes.
+        """
+        return self._getIndex("releaseDate").largest(k)
+
+    def _lengthIndexes(self, mediaType):
+        """
+        Return the length indexes that cover mediaType, which is Track,
+        Movie or None for both.
+        """
+        if mediaType is None:
+            return [self._getIndex("trackLength"), self._getIndex("movieLength")]
+        if mediaType is Track:
+            return [self._getIndex("trackLength")]
+        if mediaType is Movie:
+            return [self._getIndex("movieLength")]
+        raise ValueError("mediaType must be Track, Movie or None")
+
+    def findByLength(self, minSeconds=None, maxSeconds=None, mediaType=None) -> list:
+        """
+        Returns the nodes of the tracks and movies whose exact length is
+        between minSeconds and maxSeconds (both included), shortest first.
+        For example, findByLength(180, 300, Track) returns the tracks between
+        3 and 5 minutes. Lengths are compared in milliseconds, so unlike
+        length() no rounding is involved.
+
+        Parameters
+        ----------
+        minSeconds : float or None
+            The shortest length to include, None means no lower bound.
+        maxSeconds : float or None
+            The longest length to include, None means no upper bound.
+        mediaType : type or None
+            Track or Movie to only search one kind, None searches both.
+
+        Returns
+        -------
+        list
+            The playlist nodes, ready to pass to jumpTo.
+        """
+        low = None if minSeconds is None else math.ceil(minSeconds * 1000)
+        high = None if maxSeconds is None else math.floor(maxSeconds * 1000) + 1
+        indexes = self._lengthIndexes(mediaType)
+        if len(indexes) == 1:
+            return indexes[0].range(low, high)
+        return list(merge(*(index.range(low, high) for index in indexes),
+                          key=lambda node: self._nodeLength(node, indexes)))
+
+    def shortest(self, k, mediaType=None) -> list:
+        """
+        Returns the nodes of the k shortest tracks and movies, shortest first.
+
+        Parameters
+        ----------
+        k : int
+            The number of media to return.
+        mediaType : type or None
+            Track or Movie to only search one kind, None searches both.
+
+        Returns
+        -------
+        list
+            The playlist nodes.
+        """
+        indexes = self._lengthIndexes(mediaType)
+        merged = merge(*(index.smallest(k) for index in indexes),
+                       key=lambda node: self._nodeLength(node, indexes))
+        return list(merged)[:max(k, 0)]
+
+    def longest(self, k, mediaType=None) -> list:
+        """
+        Returns the nodes of the k longest tracks and movies, longest first.
+
+        Parameters
+        ----------
+        k : int
+            The number of media to return.
+        mediaType : type or None
+            Track or Movie to only search one kind, None searches both.
+
+        Returns
+        -------
+        list
+            The playlist nodes.
+        """
+        indexes = self._lengthIndexes(mediaType)
+        merged = merge(*(index.largest(k) for index in indexes),
+                       key=lambda node: self._nodeLength(node, indexes), reverse=True)
+        return list(merged)[:max(k, 0)]
+
+    @staticmethod
+    def _nodeLength(node, indexes):
+        """
+        Return the indexed length of a node from whichever index holds it.
+        """
+        for index in indexes:
+            key = index.nodeKey(node)
+            if key is not None:
+                return key
+        return None
+
+    def jumpTo(self, node) -> bool:
+        """
+        Makes node, e.g. one returned by findByLength or releasedBetween,
+        the currentMediaNode.
+
+        Parameters
+        ----------
+        node : Node
+            A node of this playlist.
+
+        Returns
+        -------
+        bool
+            True if the current media was changed, False if the node is a
+            dummy node or has been removed from the playlist.
+        """
+        if (node is None or node == self.playlist.dummyHead or node == self.playlist.dummyTail
+                or self.playlist._isNodeUnbound(node)):
+            return False
+        self.currentMediaNode = node
+        if self._observers:
+            self._notify("jump", node)
+        return True
+
+    def search(self, query, limit=10) -> list:
+        """
+        Returns the nodes whose title, artist or album match every word of
+        the query, best match first. The last word is matched as a prefix
+        unless the query ends with a space, so the results follow the user
+        while typing.
+
+        Parameters
+        ----------
+        query : str
+            The text to search for.
+        limit : int
+            The maximum number of nodes to return, default value: 10
+
+        Returns
+        -------
+        list
+            The playlist nodes, ready to pass to jumpTo.
+        """
+        return self._getIndex("search").search(query, limit)
+
+    def searchMemoryReport(self) -> dict:
+        """
+        Returns the estimated memory use of the search index, see
+        SearchIndex.memoryReport. Builds the index if needed.
+        """
+        return self._getIndex("search").memoryReport()
+
+
+class PlaylistSnapshot(LinkedListSnapshot):
+    """
+    An immutable view of a Player's playlist, see Player.snapshot().
+
+    Attributes
+    ----------
+    currentMedia : Media | Track | Movie | None
+        The media of the currentMediaNode when the snapshot was taken.
+    """
+
+    def __init__(self, player):
+        """
+        Initializes the snapshot of the player's playlist.
+        """
+        super().__init__(player.playlist)
+        self.currentMedia = player.currentMediaNode.data if player.currentMediaNode else None
+
+    def playForward(self):
+        """
+        Plays all the media of the snapshot from front to the end,
+        the same way as Player.playForward.
+        """
+        if self.size == 0:
+            print("Playlist is empty.")
+        else:
+            for media in self:
+                media.play()
+
+    def playBackward(self):
+        """
+        Plays all the media of the snapshot from the back to front,
+        the same way as Player.playBackward.
+        """
+        if self.size == 0:
+            print("Playlist is empty.")
+        else:
+            for media in reversed(self):
+                media.play()
@@ -0,0 +1,517 @@
+import os
+import sys
+import weakref
+import threading
+from urllib.parse import quote
+from collections import OrderedDict
+from player import Player
+from media import mediaFromRecord
+from lazy_media import LazyMedia
+from journal import writeSnapshot, readSnapshot
+
+
+# The number of LazyMedia of a new source decoded to estimate the size of its media.
+_SAMPLE_SIZE = 16
+# RecordSource -> estimated bytes of a media decoded from it
+_decodedBytes = weakref.WeakKeyDictionary()
+
+
+def _attributeBytes(media):
+    """
+    Return the bytes of a concrete media and the values of its attributes.
+    """
+    attributes = vars(media)
+    size = sys.getsizeof(media) + sys.getsizeof(attributes)
+    for value in attributes.values():
+        size += sys.getsizeof(value)
+    return size
+
+
+def _estimateSource(source, samples):
+    """
+    Estimate the bytes of a media decoded from source, the average over a
+    few of its LazyMedia, decoded for the estimate only. The first estimate
+    of a source is kept, so every LazyMedia of a source is always counted
+    the same, whether it has been decoded since or not.
+    """
+    size = 0
+    for media in samples:
+        decoded = media._media
+        if decoded is None:
+            decoded = mediaFromRecord(source.read(media._offset, media._length))
+        size += _attributeBytes(decoded)
+    return _decodedBytes.setdefault(source, size // len(samples))
+
+
+def _mediaBytes(media):
+    """
+    Estimate the bytes held by one playlist entry: its node, the media and
+    the values of the media's attributes. A LazyMedia counts as the proxy
+    plus the estimated size of its media once decoded, even before it is,
+    because it is decoded without the playlist changing, e.g. by play().
+    """
+    size = sys.getsizeof(media) + 64
+    if isinstance(media, LazyMedia):
+        estimate = _decodedBytes.get(media._source)
+        if estimate is None:
+            estimate = _estimateSource(media._source, [media])
+        return size + estimate
+    return size + _attributeBytes(media)
+
+
+def estimateBytes(player):
+    """
+    Estimate the memory used by the playlist of a player, O(n).
+    LazyMedia are counted as if decoded, see _mediaBytes.
+
+    Parameters
+    ----------
+    player : Player
+        The player to measure.
+
+    Returns
+    -------
+    int
+        The estimated size in bytes.
+    """
+    size = sys.getsizeof(player) + sys.getsizeof(player.playlist)
+    # RecordSource -> [number of LazyMedia, the first ones to estimate the source from]
+    lazy = {}
+    with player.snapshot() as view:
+        for media in view:
+            if isinstance(media, LazyMedia):
+                size += sys.getsizeof(media) + 64
+                counted = lazy.get(media._source)
+                if counted is None:
+                    counted = lazy[media._source] = [0, []]
+                counted[0] += 1
+                if len(counted[1]) < _SAMPLE_SIZE:
+                    counted[1].append(media)
+            else:
+                size += _mediaBytes(media)
+    for source, (count, samples) in lazy.items():
+        estimate = _decodedBytes.get(source)
+        if estimate is None:
+            estimate = _estimateSource(source, samples)
+        size += count * estimate
+    return size
+
+
+class _Entry:
+    """
+    A cached Player, its estimated size and whether it changed since it was loaded.
+    The entry observes its player and reports size changes to the manager.
+    """
+
+    __slots__ = ('manager', 'playlistId', 'player', 'size', 'dirty', 'stale')
+
+    def __init__(self, manager, playlistId, player, size):
+        self.manager = manager
+        self.playlistId = playlistId
+        self.player = player
+        self.size = size
+        self.dirty = False
+        self.stale = False
+
+    def __call__(self, event, *args):
+        self.dirty = True
+        delta = 0
+        stale = False
+        if event == "add":
+            delta = _mediaBytes(args[0])
+        elif event == "remove":
+            delta = -_mediaBytes(args[1].data)
+        elif event == "merge":
+            delta = sum(_mediaBytes(media) for media in args[0])
+        elif event == "batch":
+            insertions, deletions = args
+            delta = sum(_mediaBytes(media) for _, media in insertions)
+            stale = bool(deletions)
+        elif event == "clear":
+            delta = estimateBytes(self.player) - self.size
+        elif event == "split":
+            stale = True
+        if delta or stale:
+            self.manager._resize(self, delta, stale)
+
+
+class _Pending:
+    """
+    A load or an eviction in progress, other threads asking for the same
+    playlist wait for it instead of starting their own load.
+    """
+
+    __slots__ = ('event', 'player', 'error', 'evicting')
+
+    def __init__(self, evicting=False):
+        self.event = threading.Event()
+        self.player = None
+        self.error = None
+        self.evicting = evicting
+
+
+class PlaylistManager:
+    """
+    Keeps the most recently used playlists loaded as Players, and the rest on disk.
+
+    get() returns the cached Player of a playlist, or loads it: from its
+    snapshot in directory if it was evicted before, otherwise from the JSON
+    file sourceOf returns, otherwise as a new empty Player. Concurrent
+    get() calls for the same playlist share one load.
+
+    When the cache holds more than maxEntries players or more than maxBytes
+    estimated bytes, the least recently used players are evicted. A player
+    that changed since it was loaded is written to its snapshot first,
+    see journal.writeSnapshot(). A get() for a playlist being evicted waits
+    for the write and gets the same Player back.
+
+    A Player returned by get() should not be kept across requests: once it
+    is evicted, later changes to it are not saved. Call get() again instead.
+
+    Attributes
+    ----------
+    directory : str
+        The directory holding the snapshots of evicted playlists.
+    maxEntries : int or None
+        The maximum number of cached players, None means no limit.
+    maxBytes : int or None
+        The maximum estimated size of the cached players, None means no limit.
+    sourceOf : callable or None
+        Called with a playlist id, returns the JSON file to load it from or None.
+    lazy : bool
+        Whether JSON files are loaded with LazyMedia, see Player.loadFromJson().
+        They count towards maxBytes as if they were decoded.
+    hits : int
+        The number of get() calls answered from the cache.
+    misses : int
+        The number of get() calls that started a load.
+    coalesced : int
+        The number of get() calls that waited for another call's load or eviction.
+    loads : int
+        The number of players loaded from a snapshot or a JSON file.
+    evictions : int
+        The number of players evicted.
+    writes : int
+        The number of snapshots written.
+    writeErrors : int
+        The number of snapshots that failed to be written on eviction,
+        their players were kept in the cache.
+    """
+
+    def __init__(self, directory, maxEntries=None, maxBytes=None, sourceOf=None, lazy=False):
+        """
+        Initializes an empty cache.
+
+        Parameters
+        ----------
+        directory : str
+            The directory to keep snapshots in, created if needed.
+        maxEntries : int or None
+            The maximum number of cached players, default value: None
+        maxBytes : int or None
+            The maximum estimated size in bytes of the cached players, default value: None
+        sourceOf : callable or None
+            Returns the JSON file of a playlist id, or None if it has none, default value: None
+        lazy : bool
+            Load JSON files with LazyMedia, default value: False
+        """
+        if maxEntries is not None and maxEntries < 1:
+            raise ValueError("maxEntries must be at least 1")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.sourceOf = sourceOf
+        self.lazy = lazy
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.loads = 0
+        self.evictions = 0
+        self.writes = 0
+        self.writeErrors = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._writeLock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, playlistId):
+        return playlistId in self._entries
+
+    def snapshotFile(self, playlistId):
+        """
+        Return the name of the snapshot file of a playlist.
+        """
+        return os.path.join(self.directory, quote(str(playlistId), safe='') + '.json')
+
+    def get(self, playlistId):
+        """
+        Return the Player of a playlist, loading it if it isn't cached.
+
+        Parameters
+        ----------
+        playlistId : hashable
+            The id of the playlist.
+
+        Returns
+        -------
+        Player
+            The player of the playlist.
+        """
+        revived = None
+        revivedSize = 0
+        while True:
+            with self._lock:
+                entry = self._entries.get(playlistId)
+                if entry is not None:
+                    self._entries.move_to_end(playlistId)
+                    self.hits += 1
+                    return entry.player
+                pending = self._pending.get(playlistId)
+                if pending is None and revived is not None:
+                    # The playlist was evicted while this call waited, put the same player back.
+                    evicted = self._insert(playlistId, revived, revivedSize)
+                    break
+                if pending is None:
+                    pending = self._pending[playlistId] = _Pending()
+                    self.misses += 1
+                    owner = True
+                else:
+                    self.coalesced += 1
+                    owner = False
+
+            if owner:
+                try:
+                    player = self._load(playlistId)
+                    size = estimateBytes(player)
+                except BaseException as error:
+                    with self._lock:
+                        del self._pending[playlistId]
+                    pending.error = error
+                    pending.event.set()
+                    raise
+                with self._lock:
+                    del self._pending[playlistId]
+                    self.loads += 1
+                    evicted = self._insert(playlistId, player, size)
+                pending.player = player
+                pending.event.set()
+                self._persist(evicted)
+                return player
+
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            if not pending.evicting:
+                return pending.player
+            revived = pending.player
+            revivedSize = estimateBytes(revived)
+
+        self._persist(evicted)
+        return revived
+
+    def _load(self, playlistId):
+        """
+        Build the Player of a playlist that isn't cached.
+        """
+        snapshotFile = self.snapshotFile(playlistId)
+        if os.path.exists(snapshotFile):
+            player, _ = readSnapshot(snapshotFile)
+            return player
+        player = Player()
+        fileName = self.sourceOf(playlistId) if self.sourceOf is not None else None
+        if fileName is not None:
+            player.loadFromJson(fileName, lazy=self.lazy)
+        return player
+
+    def _insert(self, playlistId, player, size):
+        """
+        Cache a player and pick the players to evict, the lock must be held.
+
+        Returns
+        -------
+        list
+            The evicted playlist ids, entries and pending evictions, to be passed to _persist().
+        """
+        entry = _Entry(self, playlistId, player, size)
+        player.addObserver(entry)
+        self._entries[playlistId] = entry
+        self._bytes += size
+        return self._overflow()
+
+    def _overflow(self):
+        """
+        Remove least recently used entries until the cache fits its limits,
+        always keeping the most recent one. The lock must be held.
+        Every evicted playlist gets a pending eviction, so it isn't
+        loaded from an old snapshot before the new one is written.
+        """
+        evicted = []
+        while len(self._entries) > 1 and self._overLimit():
+            playlistId, entry = self._entries.popitem(last=False)
+            entry.player.removeObserver(entry)
+            self._bytes -= entry.size
+            pending = self._pending[playlistId] = _Pending(evicting=True)
+            self.evictions += 1
+            evicted.append((playlistId, entry, pending))
+        return evicted
+
+    def _resize(self, entry, delta, stale):
+        """
+        Apply a change of the size of a cached player, reported by its entry,
+        and evict other players if the cache went over maxBytes.
+        """
+        with self._lock:
+            entry.size += delta
+            if stale:
+                entry.stale = True
+            if self._entries.get(entry.playlistId) is not entry:
+                return
+            self._bytes += delta
+            evicted = self._overflow()
+        self._persist(evicted)
+
+    def _overLimit(self) -> bool:
+        """
+        Return True if the cache holds too many players or too many bytes.
+        Sizes made stale by bulk changes are estimated again first.
+        """
+        if self.maxEntries is not None and len(self._entries) > self.maxEntries:
+            return True
+        if self.maxBytes is None:
+            return False
+        if self._bytes > self.maxBytes:
+            for entry in self._entries.values():
+                if entry.stale:
+                    entry.stale = False
+                    size = estimateBytes(entry.player)
+                    self._bytes += size - entry.size
+                    entry.size = size
+        return self._bytes > self.maxBytes
+
+    def _persist(self, evicted):
+        """
+        Write the snapshots of evicted players that changed, then release
+        the get() calls waiting for them. Runs without the lock.
+        A player whose snapshot can't be written goes back into the cache,
+        as the least recently used one, so its changes aren't lost;
+        the first error is raised once every eviction is released.
+        """
+        failure = None
+        failed = []
+        try:
+            for playlistId, entry, pending in evicted:
+                try:
+                    if entry.dirty:
+                        self._write(playlistId, entry.player)
+                except Exception as error:
+                    if failure is None:
+                        failure = error
+                    failed.append((playlistId, entry))
+        finally:
+            with self._lock:
+                self.writeErrors += len(failed)
+                for playlistId, entry in reversed(failed):
+                    self._entries[playlistId] = entry
+                    self._entries.move_to_end(playlistId, last=False)
+                    self._bytes += entry.size
+                    entry.player.addObserver(entry)
+                for playlistId, entry, pending in evicted:
+                    del self._pending[playlistId]
+            for playlistId, entry, pending in evicted:
+                pending.player = entry.player
+                pending.event.set()
+        if failure is not None:
+            raise failure
+
+    def _write(self, playlistId, player):
+        """
+        Write the snapshot of a player, one write at a time so that flush()
+        and an eviction never share the temporary file of a playlist.
+        """
+        with self._writeLock:
+            writeSnapshot(player, self.snapshotFile(playlistId))
+        with self._lock:
+            self.writes += 1
+
+    def evict(self, playlistId) -> bool:
+        """
+        Evict a playlist now, writing its snapshot if it changed.
+
+        Parameters
+        ----------
+        playlistId : hashable
+            The id of the playlist.
+
+        Returns
+        -------
+        bool
+            True if the playlist was cached, False otherwise.
+        """
+        with self._lock:
+            entry = self._entries.pop(playlistId, None)
+            if entry is None:
+                return False
+            entry.player.removeObserver(entry)
+            self._bytes -= entry.size
+            pending = self._pending[playlistId] = _Pending(evicting=True)
+            self.evictions += 1
+        self._persist([(playlistId, entry, pending)])
+        return True
+
+    def flush(self):
+        """
+        Write the snapshot of every cached player that changed, keeping them cached.
+        """
+        with self._lock:
+            dirty = [(playlistId, entry) for playlistId, entry in self._entries.items() if entry.dirty]
+        for playlistId, entry in dirty:
+            entry.dirty = False
+            try:
+                self._write(playlistId, entry.player)
+            except BaseException:
+                entry.dirty = True
+                raise
+
+    def close(self):
+        """
+        Evict every cached player, writing the ones that changed.
+        """
+        with self._lock:
+            playlistIds = list(self._entries)
+        for playlistId in playlistIds:
+            self.evict(playlistId)
+
+    def stats(self) -> dict:
+        """
+        Return the cache metrics.
+
+        Returns
+        -------
+        dict
+            The number of cached players and their estimated bytes, the hits,
+            misses, coalesced calls, loads, evictions, snapshot writes, failed
+            writes and the hit rate.
+        """
+        with self._lock:
+            requests = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "writes": self.writes,
+                "writeErrors": self.writeErrors,
+                "hitRate": (self.hits + self.coalesced) / requests if requests else 0.0,
+            }
+
+
+if __name__ == "__main__":
+    pass
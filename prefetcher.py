@@ -0,0 +1,303 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from lazy_media import resolveMedia
+
+
+class LocalFetcher:
+    """
+    A stand in for resolving the url of a media into something playable,
+    e.g. a stream handle from a CDN. Each call takes latency seconds.
+
+    Attributes
+    ----------
+    latency : float
+        The time in seconds one fetch takes.
+    calls : int
+        The number of fetches done.
+    """
+
+    def __init__(self, latency=0.01):
+        """
+        Initializes the fetcher.
+
+        Parameters
+        ----------
+        latency : float
+            The time in seconds one fetch takes, default value: 0.01
+        """
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, url):
+        """
+        Fetch a url.
+
+        Returns
+        -------
+        str
+            A handle for the fetched url.
+        """
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+        return "stream:" + str(url)
+
+
+class Prefetcher:
+    """
+    Prepares the media around the currentMediaNode of a Player ahead of time.
+
+    The prefetcher observes the player. Whenever the current media moves or
+    the playlist changes, the current media, the next `ahead` and the
+    previous `behind` media are prepared in a thread pool. Work for media
+    that left that window, because the user skipped or the media was
+    removed, is cancelled if it hasn't started and dropped otherwise.
+
+    Preparing a media means decoding it if it is a LazyMedia and resolving
+    its url with the fetcher, or calling the given prepare function.
+    play() and prepared() pick up the prepared result, waiting for it if
+    it is still running, so the hot path only pays for work that wasn't
+    done ahead of time.
+
+    Attributes
+    ----------
+    player : Player
+        The observed player.
+    ahead : int
+        The number of media after the current one to prepare.
+    behind : int
+        The number of media before the current one to prepare.
+    hits : int
+        The number of prepared() calls whose result was ready.
+    late : int
+        The number of prepared() calls that waited for a running preparation.
+    misses : int
+        The number of prepared() calls that had to prepare on the spot.
+    cancelled : int
+        The number of preparations cancelled before they started.
+    stale : int
+        The number of preparations that were running, or done but never used, when their media left the window.
+    errors : int
+        The number of preparations that failed in the pool and were done again on the spot.
+    """
+
+    def __init__(self, player, fetcher=None, prepare=None, ahead=2, behind=1, workers=2):
+        """
+        Initializes the prefetcher and starts watching the player.
+
+        Parameters
+        ----------
+        player : Player
+            The player to watch.
+        fetcher : callable or None
+            Resolves a url, default value: a LocalFetcher
+        prepare : callable or None
+            Called with a media, returns what play() needs for it.
+            Default value: decode the media and call fetcher with its url
+        ahead : int
+            The number of media after the current one to prepare, default value: 2
+        behind : int
+            The number of media before the current one to prepare, default value: 1
+        workers : int
+            The number of threads in the pool, default value: 2
+        """
+        if ahead < 0 or behind < 0:
+            raise ValueError("ahead and behind must not be negative")
+        self.player = player
+        self.fetcher = fetcher if fetcher is not None else LocalFetcher()
+        self.prepare = prepare if prepare is not None else self._prepareMedia
+        self.ahead = ahead
+        self.behind = behind
+        self.hits = 0
+        self.late = 0
+        self.misses = 0
+        self.cancelled = 0
+        self.stale = 0
+        self.errors = 0
+        self.stall = 0.0
+        self._work = {}
+        self._used = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        player.addObserver(self)
+        self._schedule()
+
+    def _prepareMedia(self, media):
+        """
+        The default preparation: decode the media, then resolve its url.
+        """
+        return self.fetcher(resolveMedia(media).url)
+
+    def _window(self):
+        """
+        Return the nodes to prepare, the current one first, then the ones
+        after it, then the ones before it.
+        """
+        current = self.player.currentMediaNode
+        playlist = self.player.playlist
+        if current is None:
+            return []
+        nodes = [current]
+        node = current.next
+        for _ in range(self.ahead):
+            if node is None or node is playlist.dummyTail:
+                break
+            nodes.append(node)
+            node = node.next
+        node = current.prev
+        for _ in range(self.behind):
+            if node is None or node is playlist.dummyHead:
+                break
+            nodes.append(node)
+            node = node.prev
+        return nodes
+
+    def _schedule(self):
+        """
+        Submit the nodes of the window that aren't being prepared yet and
+        drop the work for nodes that left it.
+        """
+        window = self._window()
+        with self._lock:
+            if self._executor is None:
+                return
+            keep = set(window)
+            for node in [node for node in self._work if node not in keep]:
+                self._drop(node)
+            for node in window:
+                if node not in self._work:
+                    self._work[node] = self._executor.submit(self.prepare, node.data)
+
+    def _drop(self, node):
+        """
+        Forget the work for a node, cancelling it if it hasn't started.
+        The lock must be held.
+        """
+        future = self._work.pop(node, None)
+        if future is None:
+            return
+        if node in self._used:
+            self._used.discard(node)
+        elif future.cancel():
+            self.cancelled += 1
+        else:
+            self.stale += 1
+
+    def __call__(self, event, *args):
+        """
+        The Player observer callback.
+        """
+        if event == "remove":
+            with self._lock:
+                self._drop(args[1])
+        self._schedule()
+
+    def prepared(self, node=None):
+        """
+        Return the prepared result of a node, waiting for it if it is still
+        being prepared, or preparing it now if it wasn't scheduled.
+
+        Parameters
+        ----------
+        node : Node or None
+            A node of the playlist, None means the currentMediaNode.
+
+        Returns
+        -------
+        object
+            What prepare returned for the media of the node, None if there is no node.
+        """
+        if node is None:
+            node = self.player.currentMediaNode
+        if node is None or node.data is None:
+            return None
+        with self._lock:
+            future = self._work.get(node)
+        start = time.perf_counter()
+        if future is not None:
+            ready = future.done()
+            try:
+                result = future.result()
+            except CancelledError:
+                future = None
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+                future = None
+            else:
+                with self._lock:
+                    if node in self._work:
+                        self._used.add(node)
+                    if ready:
+                        self.hits += 1
+                    else:
+                        self.late += 1
+                        self.stall += time.perf_counter() - start
+                return result
+        result = self.prepare(node.data)
+        with self._lock:
+            self.misses += 1
+            self.stall += time.perf_counter() - start
+        return result
+
+    def play(self):
+        """
+        Play the current media of the player once it is prepared.
+
+        Returns
+        -------
+        object
+            The prepared result of the current media, None if there is none.
+        """
+        result = self.prepared()
+        self.player.play()
+        return result
+
+    def stats(self) -> dict:
+        """
+        Return the prefetch metrics.
+
+        Returns
+        -------
+        dict
+            The hits, late and missed prepared() calls, the hit rate, the
+            cancelled, stale and failed preparations, the number of nodes in
+            flight or ready, and the average time prepared() waited, in milliseconds.
+        """
+        with self._lock:
+            requests = self.hits + self.late + self.misses
+            return {
+                "hits": self.hits,
+                "late": self.late,
+                "misses": self.misses,
+                "hitRate": self.hits / requests if requests else 0.0,
+                "cancelled": self.cancelled,
+                "stale": self.stale,
+                "errors": self.errors,
+                "pending": len(self._work),
+                "averageStallMs": self.stall * 1000 / requests if requests else 0.0,
+            }
+
+    def close(self):
+        """
+        Stop watching the player, cancel the queued work and wait for the running work.
+        """
+        self.player.removeObserver(self)
+        with self._lock:
+            executor, self._executor = self._executor, None
+            for node in list(self._work):
+                self._drop(node)
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,121 @@
+import os
+import json
+import random
+import shutil
+import tempfile
+import unittest
+from media import mediaFromRecord
+from player import Player
+from journal import PlaylistJournal
+
+RECORDS = json.load(open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "base_data.json")))
+
+
+def state(player):
+    """
+    Return the media, the index of the currentMediaNode and the size of a player.
+    """
+    infos = []
+    current = None
+    node = player.playlist.dummyHead.next
+    while node is not player.playlist.dummyTail:
+        if node is player.currentMediaNode:
+            current = len(infos)
+        infos.append(node.data.info())
+        node = node.next
+    return infos, current, player.playlist.size
+
+
+class TestPlaylistJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def randomChanges(self, player, journal, rng, steps):
+        for _ in range(steps):
+            choice = rng.random()
+            size = player.playlist.size
+            if choice < 0.3:
+                player.addMedia(mediaFromRecord(rng.choice(RECORDS)))
+            elif choice < 0.4 and size:
+                player.removeMedia(rng.randrange(size))
+            elif choice < 0.5:
+                player.next()
+            elif choice < 0.55:
+                player.prev()
+            elif choice < 0.6:
+                player.resetCurrentMediaNode()
+            elif choice < 0.65 and size:
+                player.applyBatch([(rng.randrange(size + 1), rng.choice(RECORDS)) for _ in range(3)],
+                                  rng.sample(range(size), min(2, size)))
+            elif choice < 0.7:
+                other = Player()
+                for _ in range(3):
+                    other.addMedia(mediaFromRecord(rng.choice(RECORDS)))
+                player.mergePlaylist(other, rng.random() < 0.5)
+            elif choice < 0.75:
+                player.splitAtCurrent()
+            elif choice < 0.8 and size:
+                node = player.playlist.dummyHead.next
+                for _ in range(rng.randrange(size)):
+                    node = node.next
+                player.jumpTo(node)
+            elif choice < 0.83:
+                Player().mergePlaylist(player)
+            elif choice < 0.86:
+                journal.compact()
+
+    def testRecoverAfterCrash(self):
+        rng = random.Random(7)
+        for trial in range(40):
+            directory = os.path.join(self.directory, str(trial))
+            journal = PlaylistJournal(directory, groupSize=rng.choice([1, 5, 1000]),
+                                      compactRatio=rng.choice([0, 0.5, 1.0]),
+                                      compactMinBytes=rng.choice([0, 300, 3000]))
+            player = journal.recover()
+            self.randomChanges(player, journal, rng, rng.randrange(1, 80))
+            journal.commit()
+            expected = state(player)
+
+            # The journal is never closed, like after a crash.
+            recovered = PlaylistJournal(directory)
+            player = recovered.recover()
+            self.assertEqual(state(player), expected)
+
+            # A torn record at the end of the journal is ignored.
+            player.addMedia(mediaFromRecord(RECORDS[0]))
+            recovered.commit()
+            expected = state(player)
+            recovered._file.write(b'\x01\x10\x00')
+            recovered._file.flush()
+            reopened = PlaylistJournal(directory)
+            player = reopened.recover()
+            self.assertEqual(state(player), expected)
+            player.next()
+            reopened.close()
+            expected = state(player)
+
+            journal = PlaylistJournal(directory)
+            self.assertEqual(state(journal.recover()), expected)
+            journal.close()
+
+    def testReplayBatchWithGeneratorDeletions(self):
+        journal = PlaylistJournal(self.directory)
+        player = journal.recover()
+        for record in RECORDS[:5]:
+            player.addMedia(mediaFromRecord(record))
+        self.assertTrue(player.applyBatch([(0, RECORDS[5])], (index for index in (1, 3))))
+        self.assertEqual(player.playlist.size, 4)
+        expected = state(player)
+        journal.close()
+
+        journal = PlaylistJournal(self.directory)
+        self.assertEqual(state(journal.recover()), expected)
+        journal.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+import gc
+import random
+import threading
+import unittest
+from itertools import islice
+from media import mediaFromRecord
+from linked_list import LinkedList
+from player import Player
+from catalog_generator import CatalogGenerator
+
+
+def items(linkedList):
+    """
+    Return the data of a linked list front to back, checking the back links.
+    """
+    forward = []
+    node = linkedList.dummyHead.next
+    while node is not linkedList.dummyTail:
+        forward.append(node.data)
+        node = node.next
+    backward = []
+    node = linkedList.dummyTail.prev
+    while node is not linkedList.dummyHead:
+        backward.append(node.data)
+        node = node.prev
+    assert backward[::-1] == forward and len(forward) == linkedList.size
+    return forward
+
+
+class TestApplyBatch(unittest.TestCase):
+
+    def testMatchesSequentialChanges(self):
+        rng = random.Random(5)
+        for _ in range(2000):
+            size = rng.randrange(12)
+            batched = LinkedList()
+            sequential = LinkedList()
+            for value in range(size):
+                batched.append(value)
+                sequential.append(value)
+            deletions = rng.sample(range(size), rng.randrange(size + 1))
+            insertions = [(rng.randrange(size + 1), "i%d" % j) for j in range(rng.randrange(6))]
+            inserted, removed = batched.applyBatch(insertions, deletions)
+
+            # Indexes refer to the list before the batch: apply from the back,
+            # deletions before insertions at the same index, and insertions
+            # at the same index in reverse so they end up in order.
+            operations = [(index, 0, 0, None) for index in deletions]
+            operations += [(index, 1, -j, value) for j, (index, value) in enumerate(insertions)]
+            operations.sort(key=lambda operation: (-operation[0], operation[1], operation[2]))
+            for index, kind, _, value in operations:
+                if kind == 0:
+                    self.assertTrue(sequential.deleteAtIndex(index))
+                else:
+                    self.assertTrue(sequential.addAtIndex(index, value))
+
+            self.assertEqual(items(batched), items(sequential))
+            self.assertEqual([node.data for node in removed], sorted(deletions))
+            self.assertEqual(len(inserted), len(insertions))
+            for node in removed:
+                self.assertTrue(batched._isNodeUnbound(node))
+
+    def testInvalidIndexesChangeNothing(self):
+        linkedList = LinkedList()
+        linkedList.append(1)
+        self.assertIsNone(linkedList.applyBatch([(5, 'x')], []))
+        self.assertIsNone(linkedList.applyBatch([], [0, 0]))
+        self.assertEqual(items(linkedList), [1])
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def testSnapshotsMatchReference(self):
+        rng = random.Random(11)
+        for _ in range(200):
+            linkedList = LinkedList(rng.choice([0, 4]))
+            for value in range(rng.randrange(15)):
+                linkedList.append(value)
+            snapshots = []
+            value = 100
+            for _ in range(60):
+                choice = rng.random()
+                if choice < 0.15:
+                    snapshots.append((linkedList.snapshot(), items(linkedList)))
+                elif choice < 0.3:
+                    linkedList.append(value)
+                    value += 1
+                elif choice < 0.4:
+                    linkedList.appendLeft(value)
+                    value += 1
+                elif choice < 0.5:
+                    linkedList.popLeft()
+                elif choice < 0.55:
+                    linkedList.pop()
+                elif choice < 0.65:
+                    linkedList.addAtIndex(rng.randrange(linkedList.size + 1), value)
+                    value += 1
+                elif choice < 0.75 and linkedList.size:
+                    linkedList.deleteAtIndex(rng.randrange(linkedList.size))
+                elif choice < 0.82:
+                    linkedList.applyBatch([(rng.randrange(linkedList.size + 1), value + k) for k in range(3)],
+                                          rng.sample(range(linkedList.size), min(2, linkedList.size)))
+                    value += 3
+                elif choice < 0.86 and snapshots:
+                    snapshot, _ = snapshots.pop(rng.randrange(len(snapshots)))
+                    snapshot.close()
+                elif choice < 0.9 and linkedList.size:
+                    node = linkedList.dummyHead.next
+                    for _ in range(rng.randrange(linkedList.size)):
+                        node = node.next
+                    tail = linkedList.splitAt(node)
+                    tail.append(-1)
+                    linkedList.splice(tail)
+                elif choice < 0.95:
+                    other = LinkedList()
+                    other.append(value)
+                    otherSnapshot = other.snapshot()
+                    linkedList.splice(other, linkedList.dummyHead)
+                    other.append(-2)
+                    self.assertEqual(list(otherSnapshot), [value])
+                    otherSnapshot.close()
+                    value += 1
+                for snapshot, expected in snapshots:
+                    self.assertEqual(list(snapshot), expected)
+                    self.assertEqual(list(reversed(snapshot)), expected[::-1])
+                    self.assertEqual(len(snapshot), len(expected))
+                    self.assertEqual(snapshot.page(1, 3), expected[1:4])
+            for snapshot, _ in snapshots:
+                snapshot.close()
+            self.assertEqual(linkedList._liveSnapshots, 0)
+            self.assertEqual(linkedList._history, {})
+
+    def testReleasedWhenCollected(self):
+        linkedList = LinkedList()
+        linkedList.append(1)
+        snapshot = linkedList.snapshot()
+        del snapshot
+        gc.collect()
+        self.assertEqual(linkedList._liveSnapshots, 0)
+
+    def testClosedSnapshotRaises(self):
+        linkedList = LinkedList()
+        linkedList.append(1)
+        snapshot = linkedList.snapshot()
+        snapshot.close()
+        with self.assertRaises(ValueError):
+            list(snapshot)
+
+    def testConcurrentWriterAndSnapshots(self):
+        player = Player()
+        for record in islice(CatalogGenerator(seed=3).records(), 500):
+            player.addMedia(mediaFromRecord(record))
+        stop = threading.Event()
+        errors = []
+        taken = []
+
+        def snapshotter():
+            while not stop.is_set():
+                try:
+                    with player.snapshot() as view:
+                        titles = [media.title for media in view]
+                        if len(titles) != view.size or list(reversed(view)) != list(view)[::-1]:
+                            errors.append((len(titles), view.size))
+                    taken.append(len(titles))
+                except Exception as error:
+                    errors.append(error)
+
+        threads = [threading.Thread(target=snapshotter) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        rng = random.Random(1)
+        try:
+            for _ in range(5000):
+                choice = rng.random()
+                size = player.playlist.size
+                if choice < 0.4 and size > 1:
+                    player.removeMedia(rng.randrange(size))
+                elif choice < 0.8:
+                    player.addMedia(player.playlist.get(rng.randrange(size)))
+                else:
+                    player.applyBatch([(rng.randrange(size + 1), player.playlist.get(0))],
+                                      rng.sample(range(size), min(2, size - 1)))
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
+        self.assertTrue(taken)
+        self.assertEqual(player.playlist._liveSnapshots, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
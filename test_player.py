@@ -0,0 +1,78 @@
+import os
+import json
+import random
+import unittest
+from media import Media, mediaFromRecord
+from player import Player
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+BASE_DATA = os.path.join(DIRECTORY, "base_data.json")
+INSERT_RECORDS = json.load(open(os.path.join(DIRECTORY, "insert_data.json")))
+
+
+def infos(player):
+    """
+    Return the info of every media of a player and of its currentMediaNode.
+    """
+    result = []
+    node = player.playlist.dummyHead.next
+    while node is not player.playlist.dummyTail:
+        result.append(node.data.info())
+        node = node.next
+    current = player.currentMediaNode.data.info() if player.currentMediaNode else None
+    return result, current
+
+
+class TestApplyBatch(unittest.TestCase):
+
+    def testMatchesRemoveMediaAndInserts(self):
+        rng = random.Random(1)
+        for _ in range(500):
+            batched = Player()
+            batched.loadFromJson(BASE_DATA)
+            sequential = Player()
+            sequential.loadFromJson(BASE_DATA)
+            for _ in range(rng.randrange(20)):
+                batched.next()
+                sequential.next()
+            size = batched.playlist.size
+            deletions = rng.sample(range(size), rng.randrange(8))
+            insertions = [(rng.randrange(size + 1), INSERT_RECORDS[j]) for j in range(rng.randrange(10))]
+            self.assertTrue(batched.applyBatch(insertions, deletions))
+
+            operations = [(index, 0, 0, None) for index in deletions]
+            operations += [(index, 1, -j, record) for j, (index, record) in enumerate(insertions)]
+            operations.sort(key=lambda operation: (-operation[0], operation[1], operation[2]))
+            for index, kind, _, record in operations:
+                if kind == 0:
+                    sequential.removeMedia(index)
+                else:
+                    sequential.playlist.addAtIndex(index, mediaFromRecord(record))
+            self.assertEqual(infos(batched), infos(sequential))
+
+    def testRemovingLastCurrentMediaLeavesNone(self):
+        player = Player()
+        for i in range(3):
+            player.addMedia(Media("m%d" % i))
+        player.next()
+        player.next()
+        self.assertTrue(player.applyBatch([], [2]))
+        self.assertIsNone(player.currentMediaNode)
+
+    def testFirstInsertionIntoEmptyPlayerBecomesCurrent(self):
+        player = Player()
+        self.assertTrue(player.applyBatch([(0, Media("x"))], []))
+        self.assertEqual(player.currentMediaNode.data.title, "x")
+
+    def testIndexesFollowTheBatch(self):
+        player = Player()
+        player.loadFromJson(BASE_DATA)
+        player.newest(1)
+        player.search("x")
+        player.findByLength(0, 10)
+        player.applyBatch([(3, record) for record in INSERT_RECORDS], [0, 1, 2])
+        self.assertEqual(len(player._indexes["search"]), player.playlist.size)
+
+
+if __name__ == "__main__":
+    unittest.main()
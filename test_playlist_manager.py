@@ -0,0 +1,76 @@
+import io
+import os
+import random
+import shutil
+import tempfile
+import threading
+import contextlib
+import unittest
+from media import Media
+from playlist_manager import PlaylistManager, estimateBytes
+
+BASE_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "base_data.json")
+
+
+class TestPlaylistManager(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def testEvictedChangesAreSaved(self):
+        manager = PlaylistManager(self.directory, maxEntries=1)
+        player = manager.get("a")
+        player.addMedia(Media("T", "A", "2000", "u"))
+        manager.get("b")
+        self.assertTrue(os.path.exists(manager.snapshotFile("a")))
+        reloaded = manager.get("a")
+        self.assertIsNot(reloaded, player)
+        self.assertEqual(reloaded.playlist.size, 1)
+        manager.close()
+
+    def testConcurrentGets(self):
+        manager = PlaylistManager(self.directory, maxEntries=3, sourceOf=lambda playlistId: BASE_DATA)
+        errors = []
+
+        def worker(seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(300):
+                    player = manager.get(rng.randrange(8))
+                    if rng.random() < 0.3:
+                        player.next()
+                    elif rng.random() < 0.1:
+                        player.addMedia(Media("T", "A", "2000", "u"))
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertLessEqual(len(manager._entries), 3)
+        self.assertEqual(manager._pending, {})
+        self.assertEqual(manager._bytes, sum(entry.size for entry in manager._entries.values()))
+        manager.close()
+
+    def testLazyPlayersCountAsDecoded(self):
+        manager = PlaylistManager(self.directory, sourceOf=lambda playlistId: BASE_DATA, lazy=True)
+        players = [manager.get(i) for i in range(3)]
+        tracked = manager._bytes
+        with contextlib.redirect_stdout(io.StringIO()):
+            for player in players:
+                node = player.playlist.dummyHead.next
+                while node is not player.playlist.dummyTail:
+                    node.data.play()
+                    node = node.next
+        self.assertEqual(tracked, sum(estimateBytes(player) for player in players))
+        manager.close()
+
+
+if __name__ == "__main__":
+    unittest.main()